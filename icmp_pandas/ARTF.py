@@ -1,10 +1,13 @@
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
-from datetime import datetime as dt
 from collections import defaultdict as dd
-from ._utility import subDF_str_attr, get_file_path
+from ._utility import subDF_str_attr, get_file_path, str2DT, _DT2dayfirst
 from pathlib import Path
 
+## number of rows formatted at a time when writing artf file
+_artf_write_block = 2**16
+
 
 class ArtfSeries(pd.Series):
     '''handle pandas internal operation that utilise pd.Series. This ensure pandas method will return ArtfDataFrame instead pd.DataFrame'''
@@ -65,13 +68,23 @@ class Artf_DataFrame(pd.DataFrame):
             artf_df_arg = pd.DataFrame.from_dict(self._ArtfDF_dict)
         else:
             return None
-        if artf_df_arg != None:
-            super().__init__(data=artf_df_arg, **kwargs)
+        if artf_df_arg is not None:
+            super().__init__(data=self._typed_artf(pd.DataFrame(artf_df_arg)), **kwargs)
         else:
             super().__init__(data=data, **kwargs)
 
         self._ModifiedByDefault = subDF_str_attr(ModifiedByDefault)
     
+    ## time columns, kept as datetime64 and only formatted to str when written to artf file
+    _ArtfTime_cols = ['ModifiedDate', 'StartTime', 'EndTime']
+
+    @classmethod
+    def _typed_artf(cls, artf_df) -> pd.DataFrame:
+        '''convert the time columns of artf_df that are not yet datetime64 from artf str (dayfirst) in one vectorized call per column'''
+        TypedCols = {col: str2DT(artf_df[col], dayfirst=True) for col in cls._ArtfTime_cols
+                     if col in artf_df.columns and not pd.api.types.is_datetime64_any_dtype(artf_df[col])}
+        return artf_df.assign(**TypedCols) if TypedCols else artf_df
+
     @property
     def ModifiedByDefault(self):
         '''Default value of ModifiedBy in the Artf file'''
@@ -116,33 +129,45 @@ class Artf_DataFrame(pd.DataFrame):
         return csv_df.loc[:,self._ArtfDF_dict.keys()]\
     
     @classmethod
-    def from_dt_list(cls,dt_list,signal_label='Global', dt_interval = '10s',window_before='5s', window_after='5s',dayfirst=True, **kwargs):
-        return cls(data=cls.startstop_dict_from_dt_list(dt_list,signal_label=signal_label, dt_interval = dt_interval, window_before=window_before, window_after=window_after,dayfirst=dayfirst), **kwargs)
+    def from_dt_list(cls,dt_list,signal_label='Global', dt_interval = '10s',window_before='5s', window_after='5s',dayfirst=True, time_col='DateTime', **kwargs):
+        '''build Artf_DataFrame from flagged datetime, dt_list can be per signal (see startstop_dict_from_dt_list) so a multi-signal QC run is one call'''
+        return cls(data=cls.startstop_dict_from_dt_list(dt_list,signal_label=signal_label, dt_interval = dt_interval, window_before=window_before, window_after=window_after,dayfirst=dayfirst,time_col=time_col), **kwargs)
 
     @staticmethod
-    def startstop_dict_from_dt_list(dt_list,signal_label, dt_interval = '10s',window_before='5s', window_after='5s',dayfirst=True):
+    def startstop_dict_from_dt_list(dt_list,signal_label, dt_interval = '10s',window_before='5s', window_after='5s',dayfirst=True, time_col='DateTime'):
         '''take list of datetime and group consective datetime into to a dict with StartTime and EndTime.
-        dt_interval should be no less then sample frequency.'''
-        dt_list = sorted(pd.to_datetime(dt_list, dayfirst=dayfirst))
-        dt_interval = pd.to_timedelta(dt_interval)
-        window_after = pd.to_timedelta(window_after)
-        window_before = pd.to_timedelta(window_before)
-        dt_dict = {'signal_label':[],'StartTime':[], 'EndTime':[]}
-        start_dt = dt_list[0]
-        current_dt = dt_list[0]
-        last_dt = dt_list[-1]
-        for next_dt in dt_list[1:]:
-            if next_dt > current_dt+dt_interval:
-                dt_dict['signal_label'].append(signal_label)
-                dt_dict['StartTime'].append(start_dt-window_before)
-                dt_dict['EndTime'].append(current_dt+window_after)
-                start_dt = next_dt
-            current_dt = next_dt
-            if current_dt == last_dt:
-                dt_dict['signal_label'].append(signal_label)
-                dt_dict['StartTime'].append(start_dt-window_before)
-                dt_dict['EndTime'].append(current_dt+window_after)
-                return dt_dict
+        dt_interval should be no less then sample frequency.
+        dt_list can also be keyed by signal label (signal_label is then ignored): pd.Series of datetime indexed by signal label (a Series with numeric or datetime index is
+        a plain list of datetime under signal_label, unless signal_label is None), pd.DataFrame with "signal_label" and time_col columns, or boolean pd.DataFrame of flags
+        indexed by datetime with one column per signal label.'''
+        if isinstance(dt_list, pd.DataFrame) and 'signal_label' in dt_list.columns:
+            labels, DTvalues = dt_list['signal_label'], dt_list[time_col]
+        elif isinstance(dt_list, pd.DataFrame):
+            flags = dt_list.to_numpy(dtype=bool, na_value=False)
+            RowPos, ColPos = np.nonzero(flags)
+            labels, DTvalues = dt_list.columns.to_numpy()[ColPos], pd.Series(dt_list.index).to_numpy()[RowPos]
+        elif isinstance(dt_list, pd.Series) and (signal_label is None or not (pd.api.types.is_numeric_dtype(dt_list.index) or pd.api.types.is_datetime64_any_dtype(dt_list.index))):
+            labels, DTvalues = dt_list.index.to_numpy(), dt_list
+        else:
+            DTvalues = dt_list
+            labels = np.full(len(DTvalues), signal_label, dtype=object)
+        DTvalues = pd.Series(np.asarray(DTvalues))
+        if not pd.api.types.is_datetime64_any_dtype(DTvalues):
+            DTvalues = str2DT(DTvalues, dayfirst=dayfirst)
+        DTvalues = DTvalues.to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(DTvalues)
+        codes, SignalNames = pd.factorize(np.asarray(labels, dtype=object)[valid])
+        DTvalues = DTvalues[valid]
+        order = np.lexsort((DTvalues, codes))
+        codes, DTvalues = codes[order], DTvalues[order]
+        # a new interval starts at each signal change or gap longer than dt_interval
+        IsStart = np.ones(len(DTvalues), dtype=bool)
+        IsStart[1:] = (codes[1:] != codes[:-1]) | (np.diff(DTvalues) > pd.to_timedelta(dt_interval).to_timedelta64())
+        StartPos = np.flatnonzero(IsStart)
+        EndPos = np.flatnonzero(np.roll(IsStart, -1))   # the one before next start, last one for the last interval
+        return {'signal_label': np.asarray(SignalNames, dtype=object)[codes[StartPos]],
+                'StartTime': DTvalues[StartPos] - pd.to_timedelta(window_before).to_timedelta64(),
+                'EndTime': DTvalues[EndPos] + pd.to_timedelta(window_after).to_timedelta64()}
 
     @classmethod
     def from_startstop_dict(cls,startstop_dict, ModifiedByDefault = 'ArtfDataFrame', signal_label = 'Global', **kwargs):
@@ -153,17 +178,17 @@ class Artf_DataFrame(pd.DataFrame):
         
         '''
         first_value = list(startstop_dict.values())[0]
-        if isinstance(first_value,list):
+        if np.ndim(first_value) > 0:
             value_len = len(first_value)
         else:
             value_len = 1
         if 'signal_label' not in startstop_dict.keys():
-            startstop_dict.update({'signal_label':[signal_label for _ in range(value_len)]})
+            startstop_dict.update({'signal_label':np.full(value_len, signal_label, dtype=object)})
         if 'ModifiedBy' not in startstop_dict.keys():
-            startstop_dict.update({'ModifiedBy':[ModifiedByDefault for _ in range(value_len)]})
+            startstop_dict.update({'ModifiedBy':np.full(value_len, ModifiedByDefault, dtype=object)})
         if 'ModifiedDate' not in startstop_dict.keys():
-            now_dt = dt.now().strftime("%d/%m/%Y %H:%M:%S")
-            startstop_dict.update({'ModifiedDate':[now_dt for _ in range(value_len)]})
+            now_dt = pd.Timestamp.now().floor('s').to_datetime64()
+            startstop_dict.update({'ModifiedDate':np.full(value_len, now_dt, dtype='datetime64[ns]')})
         self._check_essential_key(startstop_dict.keys(), 'dict')
         return pd.DataFrame(startstop_dict, **kwargs)
 
@@ -177,29 +202,87 @@ class Artf_DataFrame(pd.DataFrame):
         '''return a DataFrame object'''
         return pd.DataFrame(self)
 
+    ## attribute of Artefact element in artf file, in writing order
+    _Artefact_attribs = ['ModifiedBy', 'ModifiedDate', 'StartTime', 'EndTime']
+
+    def _artf_groups(self):
+        '''yield (signal_label, position of its rows) in order of first appearance of signal_label'''
+        codes, SignalNames = pd.factorize(self.signal_label)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(SignalNames) + 1))
+        for i, Name in enumerate(SignalNames):
+            yield Name, order[bounds[i]:bounds[i+1]]
+
     @property
     def artf_xml(self) -> ET.ElementTree:
         '''convert dataframe to xml format compatible for artf file'''
         root = ET.Element('ICMPArtefacts')
         ## convert pd.timestamp to str
-        SignalNames = self.signal_label.drop_duplicates()
-        for Name in SignalNames:
+        strdf = self.strdf
+        attrib_cols = np.column_stack([strdf[attrib].to_numpy() for attrib in self._Artefact_attribs])
+        for Name, rows in self._artf_groups():
             if Name != "Global":
-                ET.SubElement(root,"SignalGroup",attrib= {"Name": Name}) # for series artf
-            else:
-                ET.SubElement(root, Name)   # for global artf
-        for row in self.strdf.iterrows():
-            row = row[1]
-            SignalName = row.signal_label
-            if SignalName != "Global":
-                signal_group = root.find(f".*/[@Name='{SignalName}']")
+                signal_group = ET.SubElement(root,"SignalGroup",attrib= {"Name": Name}) # for series artf
             else:
-                signal_group = root.find("Global")
-            attrib_dict = {"ModifiedBy": row.ModifiedBy, "ModifiedDate":row.ModifiedDate,"StartTime":row.StartTime, "EndTime":row.EndTime}
-            ET.SubElement(signal_group,"Artefact",attrib=attrib_dict)
+                signal_group = ET.SubElement(root, Name)   # for global artf
+            for values in attrib_cols[rows]:
+                ET.SubElement(signal_group,"Artefact",attrib=dict(zip(self._Artefact_attribs, values)))
         ET.indent(root)
         return root
 
+    @staticmethod
+    def _escape_attrib(value:str) -> str:
+        '''escape str for xml attribute value, same as ElementTree serialisation'''
+        for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ('\r', '&#13;'), ('\n', '&#10;'), ('\t', '&#09;')):
+            value = value.replace(char, entity)
+        return value
+
+    @classmethod
+    def _escape_attrib_col(cls, col) -> np.ndarray:
+        '''escape a column of str for xml attribute value, each distinct value is escaped once (NaN gives "")'''
+        codes, uniques = pd.factorize(np.asarray(col, dtype=object))
+        escaped = np.array([cls._escape_attrib(str(value)) for value in uniques] + [''], dtype=object)
+        return escaped[codes]
+
+    def _artefact_lines(self, rows) -> str:
+        '''<Artefact .../> lines of the rows at positions rows, time attributes are formatted straight from datetime64 columns'''
+        ArtefactLines = pd.Series('    <Artefact', index=range(len(rows)))
+        for attrib in self._Artefact_attribs:
+            values = self[attrib].to_numpy()[rows]
+            to_ms = attrib != 'ModifiedDate'
+            if pd.api.types.is_datetime64_any_dtype(values.dtype):
+                # str formatted from datetime64 needs no escaping
+                AttribCol = pd.Series(_DT2dayfirst(values, to_ms)).fillna('').to_numpy()
+            else:
+                if attrib in self._ArtfTime_cols:
+                    values = self._strftime_col(values, to_ms).to_numpy()
+                AttribCol = self._escape_attrib_col(values)
+            ArtefactLines = ArtefactLines + f' {attrib}="' + AttribCol + '"'
+        return ''.join(ArtefactLines + ' />\n')
+
+    def write_artf(self, save_dir):
+        '''
+        stream the artf xml to save_dir group by group, formatting _artf_write_block rows at a time, without building the element tree.
+        Output is the same as writing artf_xml with ElementTree (us-ascii, 2 spaces indent), which ICM+ reads.
+        '''
+        with open(save_dir, 'w', encoding='us-ascii', errors='xmlcharrefreplace', newline='') as artf_file:
+            if len(self) == 0:
+                artf_file.write('<ICMPArtefacts />')
+                return
+            artf_file.write('<ICMPArtefacts>\n')
+            for Name, rows in self._artf_groups():
+                if Name != "Global":
+                    Name = self._escape_attrib(str(Name))
+                    artf_file.write(f'  <SignalGroup Name="{Name}">\n')
+                    EndTag = '  </SignalGroup>\n'
+                else:
+                    artf_file.write('  <Global>\n')
+                    EndTag = '  </Global>\n'
+                for first in range(0, len(rows), _artf_write_block):
+                    artf_file.write(self._artefact_lines(rows[first:first + _artf_write_block]))
+                artf_file.write(EndTag)
+            artf_file.write('</ICMPArtefacts>')
+
     def show_artf(self):
         '''show the xml format of the artf'''
         return ET.dump(self.artf_xml)
@@ -212,7 +295,7 @@ class Artf_DataFrame(pd.DataFrame):
             file_name = self.study_file_name
         save_dir = folder_dir+file_name+".artf"
         try:
-            ET.ElementTree(self.artf_xml).write(save_dir)
+            self.write_artf(save_dir)
             print(f"artf file saved to {save_dir}")
         except:
             print(f'failed to save artf file to {save_dir}')
@@ -222,35 +305,258 @@ class Artf_DataFrame(pd.DataFrame):
         '''convert str or pd.ts to appropriate str format for artf'''
         if isinstance(Time, pd.Timestamp):
             if to_ms:
-                str_format = "%d/%m/%Y %H:%M:%S.%f"
-                return pd.to_datetime(Time, dayfirst=True).strftime(str_format)[:-3]
+                return Time.strftime("%d/%m/%Y %H:%M:%S.%f")[:-3]
             else: 
-                str_format = "%d/%m/%Y %H:%M:%S"
-                return pd.to_datetime(Time, dayfirst=True).strftime(str_format)
+                return Time.strftime("%d/%m/%Y %H:%M:%S")
         else:
             return Time
 
     def append_artf_ts(self,signal_label="Global",StartTime=None, EndTime='None'):
         '''Add a single entry of artf_ts'''
-        attrib_dict = {"signal_label":signal_label, "ModifiedBy": self.ModifiedByDefault, "ModifiedDate":dt.now().strftime("%d/%m/%Y %H:%M:%S"),
-                        "StartTime":self.to_strftime(StartTime), "EndTime":self.to_strftime(EndTime)}
-        return self.append(attrib_dict,ignore_index=True)
+        attrib_dict = {"signal_label":[signal_label], "ModifiedBy": [self.ModifiedByDefault], "ModifiedDate":[pd.Timestamp.now().floor('s')],
+                        "StartTime":[pd.to_datetime(StartTime, dayfirst=True)], "EndTime":[pd.to_datetime(EndTime, dayfirst=True, errors='coerce')]}
+        return self._constructor(pd.concat([pd.DataFrame(self), pd.DataFrame(attrib_dict)], ignore_index=True))
 
     @property
     def dtdf(self):
-        '''retrun ArtfDataFrame with all time related entry converted to timestamp.'''
-        out_artf = self.copy()
-        out_artf[['ModifiedDate','StartTime','EndTime']] = out_artf[['ModifiedDate','StartTime','EndTime']].applymap(lambda t:pd.to_datetime(t, dayfirst=True))
-        return out_artf
+        '''
+        retrun ArtfDataFrame with all time related entry converted to timestamp.
+        Time columns are kept as datetime64 since construction, so this is self (no copy) unless str were assigned to them afterwards.
+        '''
+        if all(pd.api.types.is_datetime64_any_dtype(self[col]) for col in self._ArtfTime_cols):
+            return self
+        return self._constructor(self._typed_artf(pd.DataFrame(self)))
     
+    @staticmethod
+    def _strftime_col(TimeCol, to_ms = True) -> pd.Series:
+        '''vectorized to_strftime of a column: datetime entries are formatted to artf str in one pass, other entries are kept'''
+        TimeCol = pd.Series(TimeCol)
+        if pd.api.types.is_datetime64_any_dtype(TimeCol):
+            return pd.Series(_DT2dayfirst(TimeCol.to_numpy(), to_ms), index=TimeCol.index, name=TimeCol.name)
+        values = TimeCol.to_numpy(dtype=object, copy=True)
+        IsTS = np.fromiter((isinstance(t, pd.Timestamp) for t in values), dtype=bool, count=len(values))
+        if IsTS.any():
+            values[IsTS] = _DT2dayfirst(pd.DatetimeIndex(values[IsTS]).values, to_ms)
+        return pd.Series(values, index=TimeCol.index, name=TimeCol.name)
+
     @property
     def strdf(self):
         '''
-        return ArtfDataFrame with all timestamp converted to appropriate str format.
-        This is for compatible formatting when writing into artf file.
+        return pd.DataFrame with all timestamp converted to appropriate str format.
+        This is for compatible formatting when writing into artf file. It is a plain pd.DataFrame, as Artf_DataFrame would convert the str back to datetime.
         '''
-        out_artf = self.copy()
-        out_artf.ModifiedDate = out_artf.ModifiedDate.apply(lambda t:self.to_strftime(t,False))
-        out_artf[['StartTime','EndTime']] = out_artf[['StartTime','EndTime']].applymap(lambda t:self.to_strftime(t))
+        out_artf = pd.DataFrame(self, copy=True)
+        out_artf['ModifiedDate'] = self._strftime_col(out_artf['ModifiedDate'], False)
+        out_artf['StartTime'] = self._strftime_col(out_artf['StartTime'])
+        out_artf['EndTime'] = self._strftime_col(out_artf['EndTime'])
         return out_artf
-        
\ No newline at end of file
+
+    ###====Interval-set algebra, Global intervals apply to every signal
+    @staticmethod
+    def _sweep(SetA, SetB, rule):
+        '''
+        sort-and-sweep of two sets of closed intervals (starts, ends) as int64 ns arrays, intervals within a set may overlap.
+        return (starts, ends) of the sorted disjoint intervals where rule(inside A, inside B) holds, touching intervals are joined.
+        At equal times starts are counted before ends, so zero-length intervals and single shared time points are kept (removing one does not split an interval).
+        '''
+        nA, nB = len(SetA[0]), len(SetB[0])
+        if nA + nB == 0:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+        times = np.concatenate([SetA[0], SetA[1], SetB[0], SetB[1]])
+        deltaA = np.concatenate([np.ones(nA, 'int64'), -np.ones(nA, 'int64'), np.zeros(2*nB, 'int64')])
+        deltaB = np.concatenate([np.zeros(2*nA, 'int64'), np.ones(nB, 'int64'), -np.ones(nB, 'int64')])
+        order = np.argsort(times, kind='stable')
+        times, deltaA, deltaB = times[order], deltaA[order], deltaB[order]
+        FirstPos = np.flatnonzero(np.r_[True, times[1:] != times[:-1]])
+        UniqueTimes = times[FirstPos]
+        # depth of each set on the open span (UniqueTimes[i], UniqueTimes[i+1]), and at UniqueTimes[i] itself where intervals ending there still count
+        DepthA, DepthB = np.add.reduceat(deltaA, FirstPos).cumsum(), np.add.reduceat(deltaB, FirstPos).cumsum()
+        EndingA, EndingB = np.add.reduceat(deltaA < 0, FirstPos), np.add.reduceat(deltaB < 0, FirstPos)
+        inside = rule(DepthA > 0, DepthB > 0)
+        AtTime = rule(DepthA + EndingA > 0, DepthB + EndingB > 0)
+        # time points where rule holds but neither neighbouring span does become zero-length intervals
+        IsolatedPos = np.flatnonzero(AtTime & ~inside & ~np.r_[False, inside[:-1]])
+        edges = np.diff(np.r_[False, inside, False].astype('int8'))
+        starts = np.concatenate([UniqueTimes[edges[:-1] == 1], UniqueTimes[IsolatedPos]])
+        ends = np.concatenate([UniqueTimes[np.flatnonzero(edges == -1)], UniqueTimes[IsolatedPos]])
+        order = np.argsort(starts, kind='stable')
+        return starts[order], ends[order]
+
+    _NoInterval = (np.empty(0, dtype='int64'), np.empty(0, dtype='int64'))
+
+    @staticmethod
+    def _union(SetA, SetB=_NoInterval):
+        return Artf_DataFrame._sweep(SetA, SetB, np.logical_or)
+
+    @staticmethod
+    def _intersect(SetA, SetB):
+        return Artf_DataFrame._sweep(SetA, SetB, np.logical_and)
+
+    @staticmethod
+    def _subtract(SetA, SetB):
+        return Artf_DataFrame._sweep(SetA, SetB, lambda inA, inB: inA & ~inB)
+
+    def _label_intervals(self) -> dict:
+        '''{signal_label: (starts, ends)} as int64 ns arrays, in order of first appearance, rows with NaT or EndTime before StartTime are ignored'''
+        dtdf = self.dtdf
+        starts = dtdf['StartTime'].to_numpy(dtype='datetime64[ns]')
+        ends = dtdf['EndTime'].to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(starts) & ~np.isnat(ends) & (ends >= starts)
+        starts, ends = starts[valid].view('int64'), ends[valid].view('int64')
+        codes, SignalNames = pd.factorize(dtdf['signal_label'].to_numpy()[valid])
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(SignalNames) + 1))
+        return {Name: (starts[order[bounds[i]:bounds[i+1]]], ends[order[bounds[i]:bounds[i+1]]]) for i, Name in enumerate(SignalNames)}
+
+    def _from_label_intervals(self, LabelIntervals):
+        '''build Artf_DataFrame from {signal_label: (starts, ends)}, ModifiedBy is ModifiedByDefault and ModifiedDate is now'''
+        labels = np.repeat(np.array(list(LabelIntervals), dtype=object), [len(starts) for starts, _ in LabelIntervals.values()])
+        return self._constructor(self._from_startstop_dict({
+            'signal_label': labels,
+            'StartTime': np.concatenate([starts for starts, _ in LabelIntervals.values()] + [np.empty(0, 'int64')]).view('datetime64[ns]'),
+            'EndTime': np.concatenate([ends for _, ends in LabelIntervals.values()] + [np.empty(0, 'int64')]).view('datetime64[ns]')},
+            ModifiedByDefault=self.ModifiedByDefault, signal_label='Global'))
+
+    ## rule of each set operation on (inside self, inside other)
+    _SetRules = {'union': np.logical_or, 'intersection': np.logical_and, 'difference': lambda inA, inB: inA & ~inB}
+
+    def _set_operation(self, other, operation):
+        '''
+        apply operation per signal_label on the effective intervals (own intervals + Global) of each signal.
+        Global result is kept once and signal intervals are only what Global result does not cover.
+        For difference, Global parts removed from a signal of other are kept on the other signals listed in either frame only.
+        '''
+        rule = self._SetRules[operation]
+        A, B = self._label_intervals(), Artf_DataFrame(other)._label_intervals()
+        GlobalA, GlobalB = A.pop('Global', self._NoInterval), B.pop('Global', self._NoInterval)
+        GlobalOut = self._sweep(GlobalA, GlobalB, rule)
+        if operation == 'difference':
+            for SignalB in B.values():
+                GlobalOut = self._subtract(GlobalOut, SignalB)
+        out = {'Global': GlobalOut}
+        for Name in dict.fromkeys(list(A) + list(B)):
+            SignalA, SignalB = self._union(A.get(Name, self._NoInterval), GlobalA), self._union(B.get(Name, self._NoInterval), GlobalB)
+            out[Name] = self._subtract(self._sweep(SignalA, SignalB, rule), GlobalOut)
+        return self._from_label_intervals(out)
+
+    def merge_overlaps(self, gap = '0s'):
+        '''
+        merge overlapping (or closer than gap) artefacts of each signal_label into one, drop signal artefacts already covered by Global artefacts.
+        ModifiedBy and ModifiedDate of merged artefacts are reset to ModifiedByDefault and now.
+        '''
+        gap = pd.to_timedelta(gap).value
+        out = {}
+        for Name, (starts, ends) in self._label_intervals().items():
+            starts, ends = self._union((starts, ends + gap))
+            out[Name] = (starts, ends - gap)
+        GlobalOut = out.get('Global', self._NoInterval)
+        for Name in out:
+            if Name != 'Global':
+                out[Name] = self._subtract(out[Name], GlobalOut)
+        return self._from_label_intervals(out)
+
+    def union(self, *others):
+        '''union of artefacts of self and others (Artf_DataFrame or anything Artf_DataFrame accepts), overlaps merged'''
+        return self._constructor(pd.concat([pd.DataFrame(self)] + [pd.DataFrame(Artf_DataFrame(other)) for other in others], ignore_index=True)).merge_overlaps()
+
+    def intersection(self, other):
+        '''periods marked as artefact by both self and other, per signal_label'''
+        return self._set_operation(other, 'intersection')
+
+    def difference(self, other):
+        '''periods marked as artefact by self but not by other, per signal_label'''
+        return self._set_operation(other, 'difference')
+
+    def coverage(self, start = None, end = None) -> pd.DataFrame:
+        '''
+        statistic of artefacts of each signal_label with Global artefacts applied: number of merged artefacts, total duration and fraction of [start, end] covered.
+        start and end default to the earliest StartTime and latest EndTime of all artefacts.
+        '''
+        LabelIntervals = self._label_intervals()
+        AllIntervals = self._union((np.concatenate([starts for starts, _ in LabelIntervals.values()] + [np.empty(0, 'int64')]),
+                                    np.concatenate([ends for _, ends in LabelIntervals.values()] + [np.empty(0, 'int64')])))
+        start = pd.Timestamp(start).value if start is not None else (AllIntervals[0][0] if len(AllIntervals[0]) else 0)
+        end = pd.Timestamp(end).value if end is not None else (AllIntervals[1][-1] if len(AllIntervals[1]) else 0)
+        GlobalIntervals = LabelIntervals.get('Global', self._NoInterval)
+        stats = {'Artefacts': [], 'Duration': [], 'Coverage': []}
+        for Name, intervals in LabelIntervals.items():
+            starts, ends = self._union(intervals, GlobalIntervals)
+            # clip to [start, end] for the covered fraction
+            ClippedDuration = (np.minimum(ends, end) - np.maximum(starts, start)).clip(min=0).sum()
+            stats['Artefacts'].append(len(starts))
+            stats['Duration'].append(pd.Timedelta(int((ends - starts).sum())))
+            stats['Coverage'].append(ClippedDuration/(end - start) if end > start else float('nan'))
+        return pd.DataFrame(stats, index=pd.Index(list(LabelIntervals), name='signal_label'))
+
+    ###====Masking of signals and trends, Global artefacts apply to every signal
+    @staticmethod
+    def _in_intervals(DTvalues, intervals) -> np.ndarray:
+        '''True where DTvalues fall within one of the sorted disjoint intervals [start, end], by binary search of every time in the interval starts'''
+        starts, ends = intervals
+        DTvalues = np.asarray(DTvalues, dtype='datetime64[ns]').view('int64')
+        if len(starts) == 0:
+            return np.zeros(len(DTvalues), dtype=bool)
+        pos = np.searchsorted(starts, DTvalues, side='right') - 1
+        return (pos >= 0) & (DTvalues <= ends[np.maximum(pos, 0)])
+
+    def _mask_intervals_getter(self):
+        '''return a function signal_label -> merged (starts, ends) of the artefacts applying to it, each label is merged once'''
+        LabelIntervals = self._label_intervals()
+        GlobalIntervals = LabelIntervals.get('Global', self._NoInterval)
+        merged = {}
+        def get_intervals(signal_label):
+            if signal_label not in LabelIntervals:
+                signal_label = 'Global'
+            if signal_label not in merged:
+                merged[signal_label] = self._union(LabelIntervals.get(signal_label, self._NoInterval), GlobalIntervals)
+            return merged[signal_label]
+        return get_intervals
+
+    def artf_mask(self, DTvalues, signal_label = 'Global') -> np.ndarray:
+        '''boolean array, True where DTvalues (datetime array or DatetimeIndex) are within an artefact of signal_label or a Global artefact'''
+        return self._in_intervals(DTvalues, self._mask_intervals_getter()(signal_label))
+
+    def _mask_data(self, get_intervals, data, signal_label, inplace):
+        '''mask one signal, trend or chunk with the intervals from get_intervals, see mask_signal'''
+        if isinstance(data, tuple):
+            DTidx, values = data
+            masked = self._in_intervals(DTidx, get_intervals('Global' if signal_label is None else signal_label))
+            values = np.asarray(values)
+            # NaN can only be written into a writable float array, other chunks (e.g. read-only memmap, int samples) are masked on a float copy
+            if not np.issubdtype(values.dtype, np.floating):
+                values = values.astype('float64')
+            elif not (inplace and values.flags.writeable):
+                values = values.copy()
+            values[masked] = np.nan
+            return DTidx, values
+        try:
+            DTidx = pd.DatetimeIndex(data.index)
+        except Exception as e:
+            raise Exception('data to mask must be indexed by datetime') from e
+        out = data if inplace else data.copy()
+        if isinstance(data, pd.Series):
+            label = signal_label if signal_label is not None else (data.name if data.name is not None else 'Global')
+            out.mask(self._in_intervals(DTidx, get_intervals(label)), inplace=True)
+            return out
+        masks = {}
+        for col in data.columns:
+            intervals = get_intervals(col if signal_label is None else signal_label)
+            if id(intervals) not in masks:
+                masks[id(intervals)] = self._in_intervals(DTidx, intervals)
+            out[col] = out[col].mask(masks[id(intervals)])
+        return out
+
+    def mask_signal(self, data, signal_label = None, inplace = False):
+        '''
+        blank (NaN) the samples within artefacts, found by binary search of the sample times in the sorted merged artefacts.
+        data: pd.Series (signal, e.g. get_waves), pd.DataFrame (trend, e.g. Trend_DataFrame, one column per signal) indexed by datetime, or (DTidx, values) chunk of LazySignal.iter_chunks.
+        signal_label: artefact label to apply, default to Series name or each column name. Global artefacts always apply, labels without artefact get Global only.
+        inplace: modify data instead of a copy. A chunk that cannot hold NaN in place (read-only or not float) is masked on a float copy instead.
+        '''
+        return self._mask_data(self._mask_intervals_getter(), data, signal_label, inplace)
+
+    def mask_chunks(self, chunks, signal_label = None, inplace = False):
+        '''mask_signal on every chunk of streamed chunks (e.g. ICMP_h5py.iter_waves or LazySignal.iter_chunks), artefacts are merged once for all chunks'''
+        get_intervals = self._mask_intervals_getter()
+        for chunk in chunks:
+            yield self._mask_data(get_intervals, chunk, signal_label, inplace)
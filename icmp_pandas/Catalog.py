@@ -0,0 +1,165 @@
+import os
+import json
+import sqlite3
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from ._utility import get_file_list
+from .ICMP_h5 import ICMP_h5py, to_unix_us
+
+_Catalog_schema = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, file_name TEXT, mtime_ns INTEGER, size INTEGER,
+    RecordingStartTime TEXT, RecordingEndTime TEXT, attributes TEXT, error TEXT);
+CREATE TABLE IF NOT EXISTS signals (
+    path TEXT, signal TEXT, grp TEXT, label TEXT, frequency REAL,
+    start_us INTEGER, end_us INTEGER, samples INTEGER, gaps INTEGER);
+CREATE TABLE IF NOT EXISTS segments (
+    path TEXT, signal TEXT, start_us INTEGER, end_us INTEGER);
+CREATE INDEX IF NOT EXISTS signals_label ON signals (label, grp);
+CREATE INDEX IF NOT EXISTS segments_signal ON segments (path, signal);
+'''
+
+
+def _scan_h5(file_dir) -> dict:
+    '''read the metadata of one ICM+ HDF5 file into plain python objects (run in worker processes)'''
+    stat = os.stat(file_dir)
+    FileInfo = {'path': str(file_dir), 'file_name': Path(file_dir).stem, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                'RecordingStartTime': None, 'RecordingEndTime': None, 'attributes': None, 'error': None, 'signals': [], 'segments': []}
+    try:
+        with ICMP_h5py(file_dir, mode='r') as H5File:
+            catalog = H5File.catalog
+            FileInfo['attributes'] = json.dumps({k: str(v) for k, v in catalog['attributes'].items()})
+            for key in ('RecordingStartTime', 'RecordingEndTime'):
+                FileInfo[key] = None if pd.isnull(catalog[key]) else str(catalog[key])
+            for signal, info in catalog['signals'].iterrows():
+                if info.samples == 0:
+                    continue
+                SegmentTime = H5File.getSegmentTime_fromH5Index(H5File.get(f'{signal}.index')[()])
+                FileInfo['signals'].append((signal, info.group, info.label, info.frequency, int(SegmentTime[0, 0]), int(SegmentTime[-1, 1]), int(info.samples), int(info.gaps)))
+                FileInfo['segments'].extend((signal, int(start), int(end)) for start, end in SegmentTime)
+    except Exception as e:
+        FileInfo['error'] = repr(e)
+    return FileInfo
+
+
+class H5Catalog:
+    '''
+    On-disk (SQLite) index of a collection of ICM+ HDF5 files: file attributes, signal labels, frequencies and time coverage.
+    Build or refresh with update(folder_dir), then query() returns matching file paths without opening any HDF5 file.
+    '''
+
+    def __init__(self, catalog_dir):
+        self.catalog_dir = str(catalog_dir)
+        self._con = sqlite3.connect(self.catalog_dir)
+        self._con.executescript(_Catalog_schema)
+
+    def close(self):
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return f'H5Catalog({self.catalog_dir}, files={len(self)})'
+
+    def __len__(self):
+        return self._con.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def update(self, folder_dir, file_type='.hdf5', include_subfolders=False, workers=None, glob_regex=None) -> dict:
+        '''
+        Scan folder_dir (see get_file_list) and (re)index new or modified files (by mtime and size) over a process pool of "workers".
+        Files indexed before that are no longer on disk are removed from the catalog.
+        Return a dict counting added, updated, removed, unchanged and failed files.
+        '''
+        file_list = get_file_list(folder_dir, file_type=file_type, include_subfolders=include_subfolders, glob_regex=glob_regex) or []
+        indexed = {path: (mtime_ns, size) for path, mtime_ns, size in self._con.execute('SELECT path, mtime_ns, size FROM files')}
+        summary = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'failed': 0}
+        to_scan = []
+        for file_dir in file_list:
+            stat = os.stat(file_dir)
+            if indexed.get(file_dir) == (stat.st_mtime_ns, stat.st_size):
+                summary['unchanged'] += 1
+            else:
+                to_scan.append(file_dir)
+        folder_prefix = str(Path(folder_dir))
+        removed = [path for path in indexed if path.startswith(folder_prefix) and not os.path.isfile(path)]
+        with self._con:
+            self._delete(removed)
+        summary['removed'] = len(removed)
+        if workers == 1 or len(to_scan) <= 1:
+            results = map(_scan_h5, to_scan)
+            self._insert_all(results, indexed, summary)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                self._insert_all(executor.map(_scan_h5, to_scan, chunksize=8), indexed, summary)
+        return summary
+
+    def _insert_all(self, results, indexed, summary):
+        for FileInfo in results:
+            with self._con:
+                self._delete([FileInfo['path']])
+                self._con.execute('INSERT INTO files VALUES (?,?,?,?,?,?,?,?)',
+                                  [FileInfo[k] for k in ('path','file_name','mtime_ns','size','RecordingStartTime','RecordingEndTime','attributes','error')])
+                self._con.executemany('INSERT INTO signals VALUES (?,?,?,?,?,?,?,?,?)', [(FileInfo['path'],) + row for row in FileInfo['signals']])
+                self._con.executemany('INSERT INTO segments VALUES (?,?,?,?)', [(FileInfo['path'],) + row for row in FileInfo['segments']])
+            if FileInfo['error'] is not None:
+                summary['failed'] += 1
+            elif FileInfo['path'] in indexed:
+                summary['updated'] += 1
+            else:
+                summary['added'] += 1
+
+    def _delete(self, path_list):
+        for table in ('files', 'signals', 'segments'):
+            self._con.executemany(f'DELETE FROM {table} WHERE path = ?', [(path,) for path in path_list])
+
+    def query(self, label=None, group=None, start=None, end=None, min_frequency=None, partial=False) -> list:
+        '''
+        Return the paths of files with a signal matching all given conditions:
+        label: signal label (e.g. "ICP"), group: "waves" or "numerics", min_frequency: frequency >= min_frequency (Hz)
+        start/end: time (or window if both given) covered by one continuous segment of the signal. partial=True accepts any overlap with the window instead.
+        '''
+        conditions, params = [], []
+        if label is not None:
+            conditions.append('s.label = ?')
+            params.append(label)
+        if group is not None:
+            conditions.append('s.grp = ?')
+            params.append(group)
+        if min_frequency is not None:
+            conditions.append('s.frequency >= ?')
+            params.append(min_frequency)
+        if start is not None or end is not None:
+            start_us = to_unix_us(start if start is not None else end)
+            end_us = to_unix_us(end if end is not None else start)
+            conditions.append('seg.start_us <= ? AND seg.end_us >= ?')
+            # partial: segment overlaps the window, otherwise: segment contains the window
+            params.extend([end_us, start_us] if partial else [start_us, end_us])
+            sql = 'SELECT DISTINCT s.path FROM signals s JOIN segments seg ON seg.path = s.path AND seg.signal = s.signal'
+        else:
+            sql = 'SELECT DISTINCT s.path FROM signals s'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return [row[0] for row in self._con.execute(sql + ' ORDER BY s.path', params)]
+
+    @property
+    def files(self) -> pd.DataFrame:
+        '''indexed files and their attributes'''
+        return pd.read_sql_query('SELECT * FROM files ORDER BY path', self._con).set_index('path')
+
+    @property
+    def signals(self) -> pd.DataFrame:
+        '''indexed signals of all files, with StartTime/EndTime of the first/last sample'''
+        SignalDF = pd.read_sql_query('SELECT * FROM signals ORDER BY path, signal', self._con).rename(columns={'grp':'group'})
+        SignalDF['StartTime'] = pd.to_datetime(SignalDF.pop('start_us'), unit='us')
+        SignalDF['EndTime'] = pd.to_datetime(SignalDF.pop('end_us'), unit='us')
+        return SignalDF
+
+    @property
+    def errors(self) -> pd.Series:
+        '''files that failed to be indexed and the error raised'''
+        return self.files.error.dropna()
@@ -1,5 +1,5 @@
 import pandas as pd
-from collections import defaultdict as dd
+import numpy as np
 import warnings
 
 class Episode_Series(pd.Series):
@@ -36,41 +36,37 @@ class Episode_Dataframe(pd.DataFrame):
             return self._constructor(self)  
 
 
-    def addEvents(self, EventSeries,col_name, ValueOnly = False):
-        '''Add a new columns with dict of event logged within an EpisodeDF'''
+    def addEvents(self, EventSeries,col_name, ValueOnly = False, CountOnly = False):
+        '''
+        Add a new columns with dict of event {time: value} logged within each episode (StartDatetime <= time <= EndDatetime, events on the boundary included).
+        EventSeries is a pd.Series indexed by event time, it does not need to be sorted and episodes may overlap. Episodes without event get NaN.
+        ValueOnly: only keep the values of the dict. CountOnly: number of events within each episode instead of the dict (NaN if none, so getEmptyInterv still finds them).
+        getDeviationEventDF and getAllDeviationDF need the {time: value} dict, i.e. neither ValueOnly nor CountOnly.
+        '''
         EpisodeDF = self
         if not isinstance(EventSeries,pd.Series):
             warnings.warn('"addEvents" only accept pd.Series')
             return self
-        EpiIntervDict = {'EpiNumIndex':[],'EventsDict':[]}
-        OutboundEventList = []
-        EventDTList = list(EventSeries.index)
-        EventDT = EventDTList.pop(0)
-        for ValidEpisode in EpisodeDF.iterrows():
-            EventsDict = dd(pd.Timestamp)
-            EpiNum = ValidEpisode[0]
-            Episode = ValidEpisode[1].to_dict()
-            EpiStartDT = Episode['StartDatetime']
-            EpiEndDT = Episode['EndDatetime'] 
-            while EventDTList:
-                if EventDT >= EpiStartDT and EventDT <= EpiEndDT:
-                    EventsDict[EventDT]=EventSeries.loc[EventDT]                  
-                elif EventDT < EpiStartDT:
-                    OutboundEventList.append(EventDT)    
-                if EventDT <= EpiEndDT:
-                    EventDT = EventDTList.pop(0) 
-                if EventDT > EpiEndDT or not EventDTList:
-                    if EventDT >= EpiStartDT and EventDT <= EpiEndDT:
-                        EventsDict[EventDT]=EventSeries.loc[EventDT]   
-                    if EventsDict:
-                        EpiIntervDict['EpiNumIndex'].append(EpiNum)
-                        if ValueOnly:
-                            EpiIntervDict['EventsDict'].append(EventsDict.values())   
-                        else:
-                            EpiIntervDict['EventsDict'].append(EventsDict)   
-                    break                
-
-        return self._constructor(EpisodeDF.join(pd.Series(EpiIntervDict['EventsDict'],name=col_name,index=EpiIntervDict['EpiNumIndex'],dtype='object')))
+        # sort events once then locate the events of every episode by binary search
+        EventOrder = np.argsort(pd.DatetimeIndex(EventSeries.index).values, kind='stable')
+        EventDTIdx = pd.DatetimeIndex(EventSeries.index)[EventOrder]
+        EventValues = EventSeries.to_numpy()[EventOrder]
+        FirstEvent = np.searchsorted(EventDTIdx.values, pd.DatetimeIndex(EpisodeDF['StartDatetime']).values, side='left')
+        LastEvent = np.searchsorted(EventDTIdx.values, pd.DatetimeIndex(EpisodeDF['EndDatetime']).values, side='right')
+        EventCounts = np.maximum(LastEvent - FirstEvent, 0)
+        OutDF = EpisodeDF.copy()
+        if CountOnly:
+            OutDF[col_name] = np.where(EventCounts > 0, EventCounts, np.nan)
+            return self._constructor(OutDF)
+        EventsColumn = np.empty(len(EpisodeDF), dtype='object')
+        for i, (first, last) in enumerate(zip(FirstEvent, LastEvent)):
+            if last <= first:
+                EventsColumn[i] = float('nan')
+                continue
+            EventsDict = dict(zip(EventDTIdx[first:last], EventValues[first:last]))
+            EventsColumn[i] = EventsDict.values() if ValueOnly else EventsDict
+        OutDF[col_name] = EventsColumn
+        return self._constructor(OutDF)
 
 
     def getEmptyInterv(self):
@@ -81,68 +77,64 @@ class Episode_Dataframe(pd.DataFrame):
         return self._constructor(self[self.IntervsDict.isnull()])
 
 
-    # def getViolationEvent(self, MAX_TIME_GAP_TILL_DEVIATION = None): 
-    #     '''Iterate through EpisodeDF and the IntervDict within then extract event where time gap exceed "MAX_TIME_GAP_TILL_DEVIATION" '''
-    #     if 'IntervsDict' not in self.columns:
-    #         warnings.warn('"IntervsDict" column not found, try "addIntervs()" first.')
-    #         return self       
-    #     if not MAX_TIME_GAP_TILL_DEVIATION:
-    #         MAX_TIME_GAP_TILL_DEVIATION = self.BONANZA_main.MaxDurationTillViolation
-    #     elif isinstance(MAX_TIME_GAP_TILL_DEVIATION, str):
-    #         MAX_TIME_GAP_TILL_DEVIATION = pd.to_timedelta(MAX_TIME_GAP_TILL_DEVIATION)
-    #     elif isinstance(MAX_TIME_GAP_TILL_DEVIATION, pd.Timestamp):
-    #         pass
-    #     else:
-    #         print('MAX_TIME_GAP_TILL_DEVIATION must be pd.Timestamp or a str value')
-    #         return None
-    #     ProlongEpiWithIntervDF = self.query('IntervsDict.notnull()', engine='python')
-    #     ProtocolDeviationEventDict = dd(list)
-    #     for ProlongEpiWithInterv in ProlongEpiWithIntervDF.iterrows():
-    #         ProlongEpisode = ProlongEpiWithInterv[1].to_dict()
-    #         DatetimeList = list(ProlongEpisode['IntervsDict'].keys()) + [ProlongEpisode['EndDatetime']]
-    #         LastDT = ProlongEpisode['StartDatetime']
-    #         for datetime in DatetimeList:
-    #             DTInterval = datetime - LastDT 
-    #             if DTInterval > MAX_TIME_GAP_TILL_DEVIATION:
-    #                 ProtocolDeviationEventDict['StartDatetime'].append(LastDT)
-    #                 ProtocolDeviationEventDict['DurationTimedelta'].append(DTInterval)
-    #                 ProtocolDeviationEventDict['EndDatetime'].append(datetime)
-    #             LastDT = datetime             
-    #     return self._constructor(ProtocolDeviationEventDict, dtype='timedelta64[ns]')
-
-
-    def getAllDeviationDF(self, MAX_TIME_GAP_TILL_DEVIATION):
-        '''output an EpisodeDF where each episode is a potential violation event and added "Info" column explaining the type of violation event'''
-        if 'IntervsDict' not in self.columns:
-            warnings.warn('"IntervsDict" column not found, try "addIntervs()" first.')
+    def getDeviationEventDF(self, MAX_TIME_GAP_TILL_DEVIATION, col_name = 'IntervsDict'):
+        '''
+        Within episodes with intervention logged (col_name, see addEvents), extract every period longer than MAX_TIME_GAP_TILL_DEVIATION without intervention:
+        from start of episode to first intervention, between interventions and from last intervention to end of episode.
+        Output an EpisodeDF with "Episode" (index of the source episode) and "Type of deviation event" columns.
+        '''
+        if col_name not in self.columns:
+            warnings.warn(f'"{col_name}" column not found, try "addEvents()" first.')
+            return self
+        MAX_TIME_GAP_TILL_DEVIATION = pd.to_timedelta(MAX_TIME_GAP_TILL_DEVIATION)
+        EpiDF = self[self[col_name].notnull().to_numpy()]
+        if not all(isinstance(IntervsDict, dict) for IntervsDict in EpiDF[col_name]):
+            raise Exception(f'"{col_name}" must hold dict of {{time: value}}, add it with addEvents() without ValueOnly or CountOnly')
+        IntervTimes = [list(IntervsDict.keys()) for IntervsDict in EpiDF[col_name]]
+        IntervCounts = np.array([len(times) for times in IntervTimes], dtype='int64')
+        # flatten every episode into [episode start, interventions..., episode end], kind 0/1/2 keeps this order on equal time
+        EpiPos = np.repeat(np.arange(len(EpiDF)), IntervCounts + 2)
+        Kind = np.ones(len(EpiPos), dtype='int64')
+        Times = np.empty(len(EpiPos), dtype='datetime64[ns]')
+        FirstPos = np.cumsum(IntervCounts + 2) - (IntervCounts + 2)
+        LastPos = FirstPos + IntervCounts + 1
+        Kind[FirstPos], Kind[LastPos] = 0, 2
+        Times[FirstPos] = pd.DatetimeIndex(EpiDF['StartDatetime']).values
+        Times[LastPos] = pd.DatetimeIndex(EpiDF['EndDatetime']).values
+        if IntervCounts.sum():
+            Times[Kind == 1] = pd.DatetimeIndex(np.concatenate(IntervTimes)).values
+        Order = np.lexsort((Kind, Times, EpiPos))
+        EpiPos, Kind, Times = EpiPos[Order], Kind[Order], Times[Order]
+        # deviation: gap between consecutive time points of the same episode exceeding the limit
+        Gap = Times[1:] - Times[:-1]
+        DevPos = np.flatnonzero((EpiPos[1:] == EpiPos[:-1]) & (Gap > MAX_TIME_GAP_TILL_DEVIATION.to_timedelta64()))
+        FromEpiStart = Kind[DevPos] == 0
+        TillEpiEnd = Kind[DevPos + 1] == 2
+        DeviationType = np.select([FromEpiStart & TillEpiEnd, FromEpiStart, TillEpiEnd],
+                                  ['Empty Episode', 'From start of episode to first intervention logged', 'From last intervention logged to end of episode'],
+                                  'Between interventions')
+        return self._constructor({'StartDatetime': Times[DevPos], 'DurationTimedelta': Gap[DevPos], 'EndDatetime': Times[DevPos + 1],
+                                  'Episode': EpiDF.index.to_numpy()[EpiPos[DevPos]], 'Type of deviation event': DeviationType.astype('object')})
+
+
+    def getAllDeviationDF(self, MAX_TIME_GAP_TILL_DEVIATION, col_name = 'IntervsDict'):
+        '''
+        output an EpisodeDF where each episode is a potential violation event and added "Type of deviation event" column explaining the type of violation event.
+        Include every episode without intervention logged (Empty Episode) and the deviation events of getDeviationEventDF, sorted by StartDatetime.
+        '''
+        if col_name not in self.columns:
+            warnings.warn(f'"{col_name}" column not found, try "addEvents()" first.')
             return self             
-        EmptyProlongEpiDF = self.query('IntervsDict.isnull()', engine='python')
-        ProtocolDeviationDF = self.getDeviaitionEventDF(MAX_TIME_GAP_TILL_DEVIATION)
-        InfoList = []
-        DeviationEventDF = ProtocolDeviationDF.append(EmptyProlongEpiDF[['StartDatetime','DurationTimedelta','EndDatetime']], ignore_index = True)
-        col={'StartDatetime':'Time of last valid event',
-        'DurationTimedelta':'Duration',
-        'EndDatetime':'Time of deviation event',
-        'Info':'Type of deviation event'}
-
-        for row in DeviationEventDF.iterrows():
-            entry = row[1].to_dict()
-            Start = entry['StartDatetime'].microsecond
-            End = entry['EndDatetime'].microsecond
-
-            FromEpiStart = True if Start !=0 else False
-            TillEpiEnd = True if End !=0 else False
-            if FromEpiStart and TillEpiEnd:
-                InfoList.append('Empty Episode')
-            elif FromEpiStart and not TillEpiEnd:
-                InfoList.append('From start of episode to first intervention logged')
-            elif not FromEpiStart and TillEpiEnd:
-                InfoList.append('From last intervention logged to end of episode')
-            else:
-                InfoList.append('Between interventions')
-        DeviationEventDF = DeviationEventDF.join(pd.Series(InfoList, name='Type of deviation event',dtype='object'))
-        DeviationEventDF = DeviationEventDF.sort_values(by=['StartDatetime'])                                          
-        return DeviationEventDF
+        EmptyProlongEpiDF = self[self[col_name].isnull().to_numpy()]
+        EmptyDeviationDF = pd.DataFrame({'StartDatetime': EmptyProlongEpiDF['StartDatetime'].to_numpy(),
+                                         'DurationTimedelta': EmptyProlongEpiDF['DurationTimedelta'].to_numpy(),
+                                         'EndDatetime': EmptyProlongEpiDF['EndDatetime'].to_numpy(),
+                                         'Episode': EmptyProlongEpiDF.index.to_numpy(),
+                                         'Type of deviation event': 'Empty Episode'})
+        ProtocolDeviationDF = pd.DataFrame(self.getDeviationEventDF(MAX_TIME_GAP_TILL_DEVIATION, col_name = col_name))
+        DeviationEventDF = pd.concat([ProtocolDeviationDF, EmptyDeviationDF], ignore_index = True)
+        DeviationEventDF = DeviationEventDF.sort_values(by=['StartDatetime'], kind='stable', ignore_index = True)                                          
+        return self._constructor(DeviationEventDF)
 
     def addIntervCount(self):
         if 'IntervsDict' not in self.columns:
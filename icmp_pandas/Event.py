@@ -1,9 +1,22 @@
+import io
+import re
+from itertools import islice
 import pandas as pd
 import lxml.etree as ET
 import h5py
-from ._utility import _ICMPEvent_h5dir, _FieldValue_xmldir, _Event_xmldir, get_file_path
+from ._utility import _ICMPEvent_h5dir, get_file_path, str2DT
 from .Episode import Episode_Dataframe
-from collections import defaultdict as dd
+
+## DataFields column of ICM+ event csv is bracketed "[k:v|k:v]" and may contain the csv delimiter
+_BracketField_regex = re.compile(r'\[(?<![^,\n]\[)[^\[\]\n]*\](?=,|\r?\n|\r?$)')   # "[" checked first, it is much rarer than field start
+
+def _quote_bracket_fields(text):
+    '''wrap every bracketed csv field in double quotes (escaping the quote char inside) so the C parser of pd.read_csv keeps its commas'''
+    if '[' not in text:
+        return text
+    if '"' not in text:
+        return _BracketField_regex.sub(r'"\g<0>"', text)
+    return _BracketField_regex.sub(lambda field: '"' + field.group(0).replace('"', '""') + '"', text)
 
 
 class Event_Series(pd.Series):
@@ -27,92 +40,167 @@ class Event_DataFrame(pd.DataFrame):
         '''Overwrite internal method for compatibility'''
         return Event_Series
 
-    def __init__(self, data=None, **kwargs):
+    def __init__(self, data=None, parse_dates=True, datafields='str', encoding='utf-8', encoding_errors='strict', **kwargs):
         '''
         Accept directory of ICM+ generated event file in the following formats (csv, txt, xml, hdf5). Return empty DataFrame if file path is invalid.        
+        parse_dates: convert StartTime and EndTime to datetime
+        datafields: 'str' keep DataFields as "[k:v|k:v]" str, 'wide' replace it by one typed column per field (see datafield_df)
+        encoding/encoding_errors: text encoding of csv and txt file and how decoding errors are handled (see open)
         '''
         if get_file_path(data) != None:
-            dir_str = data
-            patientFileName = dir_str.split('\\')[-1].split('_event')[0]
-            file_type = dir_str.split('.')[-1]
-            if file_type == 'csv':
-                event_df = pd.read_csv(dir_str,delimiter=r',(?![^\[]*[\]])', engine="python")
-            elif file_type == 'txt':
-                event_df = pd.read_table(dir_str,delimiter='\t')
-            elif file_type == 'xml':
-                xroot = ET.parse(dir_str).getroot()
-                event_df = self._EventXML2Dataframe(xroot,patientFileName)
-            elif file_type == 'hdf5':
-                H5file = h5py.File(dir_str, 'r')
-                H5EventXML_string_in_bytes = H5file.get(_ICMPEvent_h5dir)[()][0]
-                xroot = ET.fromstring(H5EventXML_string_in_bytes)
-                event_df = self._EventXML2Dataframe(xroot,patientFileName)
-                H5file.close()
-            else:
-                raise FileNotFoundError(f'{data} is not a directory of value file type (csv, txt, xml, hdf5)')
-            super().__init__(event_df, **kwargs)
+            event_df, field_df = self._read_event_file(data, encoding, encoding_errors)
+            super().__init__(self._format_event_df(event_df, field_df, parse_dates, datafields), **kwargs)
         else:
             super().__init__(data=data, **kwargs)
-        
 
-    def _EventXML2Dataframe(self,xroot,DataSource):
+    @classmethod
+    def _format_event_df(cls, event_df, field_df, parse_dates, datafields):
+        '''convert StartTime and EndTime to datetime and DataFields to wide columns of freshly read event_df (see __init__)'''
+        if parse_dates:
+            for time_col in ('StartTime', 'EndTime'):
+                if time_col in event_df.columns and not pd.api.types.is_datetime64_any_dtype(event_df[time_col]):
+                    event_df[time_col] = str2DT(event_df[time_col], dayfirst=True)
+        if datafields == 'wide' and 'DataFields' in event_df.columns:
+            if field_df is None:
+                field_df = cls._datafield_long(event_df['DataFields'])
+            event_df = event_df.drop(columns='DataFields').join(cls._long2wide(field_df, event_df.index, typed=True))
+        elif datafields != 'str':
+            raise Exception(f'datafields must be "str" or "wide", got "{datafields}"')
+        return event_df
+
+    @classmethod
+    def read_datafields(cls, file_dir, form='wide', typed=True, encoding='utf-8', encoding_errors='strict') -> pd.DataFrame:
+        '''
+        read only the field values of ICM+ event file (csv, txt, xml, hdf5), taken straight from FieldValue elements for xml and hdf5.
+        form: 'wide' one column per field indexed by event row, 'long' (event_id, field, value) table
+        typed: convert the columns of numeric fields to numbers (wide only)
+        '''
+        event_df, field_df = cls._read_event_file(file_dir, encoding, encoding_errors)
+        if field_df is None:
+            field_df = cls._datafield_long(event_df['DataFields'])
+        if form == 'long':
+            return field_df
+        elif form == 'wide':
+            return cls._long2wide(field_df, event_df.index, typed=typed)
+        raise Exception(f'form must be "wide" or "long", got "{form}"')
+
+    @classmethod
+    def _read_event_file(cls, dir_str, encoding='utf-8', encoding_errors='strict'):
+        '''read event file into (event_df, field_df), field_df is the long table of field values (None for csv and txt)'''
+        patientFileName = dir_str.split('\\')[-1].split('_event')[0]
+        file_type = dir_str.split('.')[-1]
+        if file_type == 'csv':
+            with open(dir_str, 'r', encoding=encoding, errors=encoding_errors) as csv_file:
+                return cls._read_event_csv(csv_file.read()), None
+        elif file_type == 'txt':
+            return pd.read_table(dir_str,delimiter='\t', encoding=encoding, encoding_errors=encoding_errors), None
+        elif file_type == 'xml':
+            return cls._EventXML2Dataframe(dir_str,patientFileName)
+        elif file_type == 'hdf5':
+            with h5py.File(dir_str, 'r') as H5file:
+                H5EventXML_string_in_bytes = H5file.get(_ICMPEvent_h5dir)[()][0]
+            return cls._EventXML2Dataframe(io.BytesIO(H5EventXML_string_in_bytes),patientFileName)
+        raise FileNotFoundError(f'{dir_str} is not a directory of value file type (csv, txt, xml, hdf5)')
+
+    @staticmethod
+    def _read_event_csv(csv_text, **kwargs) -> pd.DataFrame:
+        '''read text of ICM+ event csv with the C parser, bracketed DataFields are quoted first so their commas do not split'''
+        return pd.read_csv(io.StringIO(_quote_bracket_fields(csv_text)), **kwargs)
+
+    @classmethod
+    def iter_csv(cls, file_dir, chunksize = 100000, parse_dates = True, datafields = 'str', encoding = 'utf-8', encoding_errors = 'strict'):
+        '''
+        read very large ICM+ event csv in chunks of chunksize rows, yield Event_DataFrame (see __init__ for parse_dates, datafields and encoding) with the row number of the file as index.
+        Chunks are cut on line breaks, so a quoted field spanning several lines (e.g. multi-line Comments) must not be split: read such file whole with read_Event.
+        '''
+        with open(file_dir, 'r', encoding=encoding, errors=encoding_errors) as csv_file:
+            header = csv_file.readline()
+            first_row = 0
+            while True:
+                lines = list(islice(csv_file, chunksize))
+                if not lines:
+                    return
+                event_df = cls._read_event_csv(header + ''.join(lines))
+                event_df.index = pd.RangeIndex(first_row, first_row + len(event_df))
+                first_row += len(event_df)
+                yield cls(cls._format_event_df(event_df, None, parse_dates, datafields))
+
+    @staticmethod
+    def _EventXML2Dataframe(xml_source,DataSource):
             '''
-            convert event.xml to event_df
+            convert event.xml (file directory or file-like object) to event_df with a streaming parser, each Event element is cleared once read.
+            return (event_df, field_df) where field_df is the long table (event_id, field, value) of all FieldValue, event_id being the row of event_df.
             '''
-            # create a list of Data entry
-            DataFieldElementList = xroot.findall(_FieldValue_xmldir)
             DataFieldList = ['DataSource','EventGroup','EventName','Category','StartTime','EndTime','DataFields','Comments']
-
             EventDict = {q:[] for q in DataFieldList}
+            FieldDict = {'event_id':[],'field':[],'value':[]}
+            event_id = 0
             # find all the event entry
-            for event in xroot.findall(_Event_xmldir):
-                # create a temporary dictionary to store data entry within single event
-                EventDict['DataSource'].append(DataSource)
-                EventDict['EventGroup'].append(event.attrib['Group'])
-                EventDict['EventName'].append(event.attrib['Name'])
-                EventDict['Category'].append(event.attrib['Category'])
-                EventDict['StartTime'].append(event.attrib['StartTime'])
-                try: 
-                    EventDict['EndTime'].append(event.attrib['EndTime'])
-                except:
-                    EventDict['EndTime'].append(float('nan'))
-                comment = event.find("Comment").text
-                if comment is None:
-                    comment = float('nan')
-                EventDict['Comments'].append(comment)
+            for _, event in ET.iterparse(xml_source, events=('end',), tag='Event'):
+                attrib = event.attrib
+                EventDict['EventGroup'].append(attrib.get('Group'))
+                EventDict['EventName'].append(attrib.get('Name'))
+                EventDict['Category'].append(attrib.get('Category'))
+                EventDict['StartTime'].append(attrib.get('StartTime'))
+                EventDict['EndTime'].append(attrib.get('EndTime', float('nan')))
+                comment = event.findtext("Comment")
+                EventDict['Comments'].append(comment if comment else float('nan'))
                 # record FieldValue of single event into a list of string with same format according to ICM+ csv
-                DataFieldstr = '['
-                for fieldvalue in event.findall("FieldValue"):
-                    DataFieldstr += f"{fieldvalue.attrib['Name']}:{fieldvalue.attrib['Value']}|"
-                DataFieldstr = DataFieldstr[:-1] + ']'
-                if len(DataFieldstr) <3:
-                    DataFieldstr = float('nan')
-                EventDict['DataFields'].append(DataFieldstr)
-            return pd.DataFrame(EventDict) 
+                FieldNames = []
+                FieldValues = []
+                for fieldvalue in event.iterchildren('FieldValue'):
+                    FieldNames.append(fieldvalue.get('Name'))
+                    FieldValues.append(fieldvalue.get('Value'))
+                if FieldNames:
+                    EventDict['DataFields'].append('[' + '|'.join(f'{k}:{v}' for k, v in zip(FieldNames, FieldValues)) + ']')
+                else:
+                    EventDict['DataFields'].append(float('nan'))
+                FieldDict['event_id'].extend([event_id]*len(FieldNames))
+                FieldDict['field'].extend(FieldNames)
+                FieldDict['value'].extend(FieldValues)
+                event_id += 1
+                # free the parsed element and the already processed siblings
+                event.clear(keep_tail=True)
+                while event.getprevious() is not None:
+                    del event.getparent()[0]
+            EventDict['DataSource'] = [DataSource]*event_id
+            return pd.DataFrame(EventDict), pd.DataFrame(FieldDict)
     
     def getEvent(self, EventList, Event_col = 'EventName'):
         '''Extract Tier events'''
         return self.query(f"{Event_col} in @EventList", engine='python')
 
-    def datafield_df(self, datafield_col = 'DataFields'):
-        DataField_series = self.loc[:,datafield_col]
-        l_str = DataField_series.str.strip('[]').str.split('|')
-        DataField_dict = dd(list)
-        nan_list = []
-        for dict_list in l_str.values:
-            key_list = []
-            if isinstance(dict_list, list):
-                for item in dict_list:
-                    key, val = item.split(':')
-                    key_list.append(key)
-                    # padding with nan for new column
-                    if not key in DataField_dict.keys():
-                        DataField_dict[key] = nan_list.copy()
-                    DataField_dict[key].append(val)
-                
-                for key in DataField_dict.keys():
-                    # adding nan to col with no new entry
-                    if not key in key_list:
-                        DataField_dict[key].append(float('nan'))
-            nan_list.append(float('nan'))
-        return pd.DataFrame.from_dict(DataField_dict)
+    @staticmethod
+    def _datafield_long(DataField_series) -> pd.DataFrame:
+        '''split "[k:v|k:v]" str into the long table (event_id, field, value), event_id being the index of DataField_series. Only the first ":" separates key and value.'''
+        items = DataField_series.dropna().astype(str).str.strip('[]').str.split('|').explode()
+        items = items[items.notna() & (items != '')]
+        if items.empty:
+            return pd.DataFrame({'event_id': DataField_series.index[:0].to_numpy(), 'field': pd.Series(dtype=object), 'value': pd.Series(dtype=object)})
+        key_val = items.str.partition(':')
+        return pd.DataFrame({'event_id': items.index.to_numpy(), 'field': key_val[0].to_numpy(),
+                             'value': key_val[2].where(key_val[1] == ':').to_numpy()})
+
+    @staticmethod
+    def _long2wide(field_df, index, typed=False) -> pd.DataFrame:
+        '''pivot the long table of field values to one column per field (in order of first appearance) on index, the last value is kept if a field repeats within an event'''
+        field_df = field_df.drop_duplicates(subset=['event_id', 'field'], keep='last')
+        wide = field_df.pivot(index='event_id', columns='field', values='value')
+        wide = wide.reindex(index=index, columns=pd.unique(field_df['field']))
+        wide.columns.name = None
+        if typed:
+            for col in wide.columns:
+                numeric = pd.to_numeric(wide[col], errors='coerce')
+                if numeric.notna().sum() == wide[col].notna().sum():
+                    wide[col] = numeric
+        return wide
+
+    def datafield_df(self, datafield_col = 'DataFields', form = 'wide', typed = False):
+        '''
+        split DataFields str ("[k:v|k:v]", ":" allowed in value) into one column per field indexed as self, or the long (event_id, field, value) table if form is 'long'.
+        typed: convert the columns of numeric fields to numbers (wide only)
+        '''
+        field_df = self._datafield_long(self.loc[:,datafield_col])
+        if form == 'long':
+            return field_df
+        return self._long2wide(field_df, self.index, typed=typed)
@@ -1,4 +1,6 @@
+import os
 import pandas as pd
+import numpy as np
 import h5py
 from collections import defaultdict as dd
 import warnings
@@ -11,6 +13,37 @@ from .Event import Event_DataFrame
 from .Trend import Trend_DataFrame
 
 
+# number of samples read at a time when resampling a raw signal onto a time grid
+_grid_window = 2**20
+
+# dtype of the .index table of a raw signal in ICM+ HDF5 file
+_H5Index_dtype = [('startidx','<i8'),('starttime','<i8'),('length','<i8'),('frequency','<f8')]
+
+def unix_us2DTidx(UnixTime) -> pd.DatetimeIndex:
+    '''convert int64 unix time in microseconds to DatetimeIndex, UnixTime is left unchanged'''
+    return pd.DatetimeIndex((np.asarray(UnixTime, dtype='int64')*1000).view('datetime64[ns]'))
+
+def _trimH5Index(startidx, starttime, freq, first, last) -> np.ndarray:
+    '''build .index table of the sub-blocks [first, last) (sample offsets within each block), dropping empty blocks'''
+    keep = last > first
+    H5Index = np.empty(keep.sum(), dtype=_H5Index_dtype)
+    H5Index['startidx'] = (startidx + first)[keep]
+    H5Index['starttime'] = (starttime + first*(1e6/freq).astype('int64'))[keep]
+    H5Index['length'] = (last - first)[keep]
+    H5Index['frequency'] = freq[keep]
+    return H5Index
+
+def _H5Index_gaps(H5Index) -> np.ndarray:
+    '''bool array marking if there is a gap between each pair of consecutive blocks (next block not starting right after the previous one or frequency changed)'''
+    starttime = H5Index['starttime']
+    freq = H5Index['frequency']
+    nextstarttime = starttime + H5Index['length']*(1e6/freq).astype('int64')
+    return (starttime[1:] != nextstarttime[:-1]) | (freq[1:] != freq[:-1])
+
+def to_unix_us(DT) -> int:
+    '''convert a datetime-like (str, pd.Timestamp, datetime) to unix time in microseconds'''
+    return pd.Timestamp(DT).value // 1000
+
 
 class ICMP_h5py(h5py.File):    
 
@@ -22,6 +55,110 @@ class ICMP_h5py(h5py.File):
     def __init__(self,file_dir, **kwargs):
         super().__init__(file_dir, **kwargs)
         self._file_dir = file_dir
+        self._catalog = None
+        self._catalog_key = None
+
+    def _file_signature(self):
+        '''(mtime, size) of the file on disk, used to invalidate the catalog'''
+        try:
+            stat = os.stat(self.filename)
+            return stat.st_mtime_ns, stat.st_size
+        except:
+            return None
+
+    @property
+    def catalog(self) -> dict:
+        '''
+        Metadata of the file, built once and reused until the file changes on disk (mtime/size).
+        keys: names (all groups/datasets), datasets ({path: (shape, dtype)}), attributes (parsed root attributes),
+        RecordingStartTime, RecordingEndTime, signals (pd.DataFrame summarising the .index table of every waves/numerics signal)
+        Call refresh_catalog() after modifying the file through this object.
+        '''
+        signature = self._file_signature()
+        if self._catalog is None or signature != self._catalog_key:
+            self._catalog = self._build_catalog()
+            self._catalog_key = signature
+        return self._catalog
+
+    def refresh_catalog(self) -> dict:
+        '''force rebuilding the catalog'''
+        self._catalog = None
+        return self.catalog
+
+    def _build_catalog(self) -> dict:
+        '''
+        listing of groups/datasets, root attributes and signal summaries, built separately so a malformed attribute
+        or .index table does not break the listing (a signal whose .index cannot be summarised is left out with a warning)
+        '''
+        names = []
+        datasets = {}
+        def _visit(name, obj):
+            names.append(name)
+            if isinstance(obj, h5py.Dataset):
+                datasets[name] = (obj.shape, obj.dtype)
+        self.visititems(_visit)
+        attributes = self._parse_attributes(self.get('/').attrs)
+        catalog = {'names': names, 'datasets': datasets, 'attributes': attributes}
+        for key, attr in (('RecordingStartTime', 'dataStartTime'), ('RecordingEndTime', 'dataEndTime')):
+            try:
+                catalog[key] = pd.to_datetime(attributes[attr].replace('.',':'))
+            except:
+                catalog[key] = pd.NaT
+        catalog['signals'] = self._summarise_signals(names, datasets)
+        return catalog
+
+    @staticmethod
+    def _parse_attributes(attrs) -> dict:
+        '''root attributes as {name: value}, ICM+ stores each value as a one element array, scalar or unreadable values are kept as read'''
+        attributes = {}
+        for k in attrs.keys():
+            try:
+                v = attrs[k]
+            except Exception as e:
+                warnings.warn(f'attribute {k} unreadable ({e!r})')
+                continue
+            attributes[k] = v[0] if np.ndim(v) and len(v) else v
+        return attributes
+
+    def _summarise_signals(self, names, datasets) -> pd.DataFrame:
+        '''pd.DataFrame summarising the .index table of every waves/numerics signal'''
+        SignalInfoDict = dd(list)
+        for GroupDir in ('waves', 'numerics'):
+            for label in self._get_labels(names, GroupDir):
+                path = f'{GroupDir}/{label}'
+                if path not in datasets or f'{path}.index' not in datasets:
+                    continue
+                try:
+                    H5Index = self.sliceH5Index(self.get(f'{path}.index')[()])
+                    length = H5Index['length']
+                    usec_per_sample = (1e6/H5Index['frequency']).astype('int64')
+                    if len(H5Index):
+                        TimeInfo = (pd.Timestamp(int(H5Index['starttime'][0]), unit='us'),
+                                    pd.Timestamp(int(H5Index['starttime'][-1] + (length[-1] - 1)*usec_per_sample[-1]), unit='us'),
+                                    # frequency of the block with the most samples
+                                    float(H5Index['frequency'][np.argmax(length)]), int(_H5Index_gaps(H5Index).sum()))
+                    else:
+                        TimeInfo = (pd.NaT, pd.NaT, float('nan'), 0)
+                except Exception as e:
+                    warnings.warn(f'{path}.index unreadable ({e!r}), {path} is left out of the catalog')
+                    continue
+                SignalInfoDict['signal'].append(path)
+                SignalInfoDict['group'].append(GroupDir)
+                SignalInfoDict['label'].append(label)
+                SignalInfoDict['shape'].append(datasets[path][0])
+                SignalInfoDict['dtype'].append(datasets[path][1])
+                SignalInfoDict['samples'].append(int(length.sum()))
+                SignalInfoDict['blocks'].append(len(H5Index))
+                for key, value in zip(('StartTime', 'EndTime', 'frequency', 'gaps'), TimeInfo):
+                    SignalInfoDict[key].append(value)
+        SignalInfoDF = pd.DataFrame(SignalInfoDict, columns=['signal','group','label','frequency','StartTime','EndTime','samples','blocks','gaps','shape','dtype'])
+        SignalInfoDF[['StartTime','EndTime']] = SignalInfoDF[['StartTime','EndTime']].astype('datetime64[ns]')
+        return SignalInfoDF.set_index('signal')
+
+    @property
+    def SignalInfo(self) -> pd.DataFrame:
+        '''summary of every waves/numerics signal (frequency, start/end time, samples, gaps, shape, dtype)'''
+        return self.catalog['signals']
 
     @property
     def NoteSeries(self):
@@ -51,46 +188,183 @@ class ICMP_h5py(h5py.File):
     def TrendDF(self):
         return Trend_DataFrame(file_dir=self._file_dir)
     
-    def RawSignal(self, GroupDir, Dataset):
+    def RawSignal(self, GroupDir, Dataset, start=None, end=None):
+        '''
+        Read a raw signal as pd.Series with DatetimeIndex.
+        start/end (inclusive) restrict the read to a time window, only the samples within the window are read from the HDF5 file.
+        '''
         try:
-            DTidx = self.getDTidx_fromH5Index(self.get(f'{GroupDir}/{Dataset}.index')[()])
-            return pd.Series(self.H5PY.get(f'{GroupDir}/{Dataset}')[()][:len(DTidx)], index=DTidx)
+            H5Index = self.sliceH5Index(self.get(f'{GroupDir}/{Dataset}.index')[()], start, end)
+            DTidx = self.getDTidx_fromH5Index(H5Index)
+            return pd.Series(self.readH5Index_samples(self.get(f'{GroupDir}/{Dataset}'), H5Index), index=DTidx, name=Dataset)
         except:
             raise Exception(f'Unable to extract {Dataset} from {GroupDir}/{Dataset}')
     
-    def get_numerics(self,data_label):
-        return self.RawSignal('numerics',data_label)
+    def get_numerics(self,data_label, start=None, end=None):
+        return self.RawSignal('numerics',data_label, start=start, end=end)
     
-    def get_waves(self,data_label):
-        return self.RawSignal('waves',data_label)
+    def get_waves(self,data_label, start=None, end=None):
+        return self.RawSignal('waves',data_label, start=start, end=end)
+
+    def LazyRawSignal(self, GroupDir, Dataset):
+        '''Lazy handle of a raw signal, samples are only read when sliced (see LazySignal)'''
+        return LazySignal(self, GroupDir, Dataset)
+
+    def get_lazy_numerics(self, data_label):
+        return self.LazyRawSignal('numerics', data_label)
+
+    def get_lazy_waves(self, data_label):
+        return self.LazyRawSignal('waves', data_label)
+
+    def iter_RawSignal(self, GroupDir, Dataset, chunk='10min', overlap='30s', copy=True):
+        '''generator of (DatetimeIndex, np.ndarray) chunks of a raw signal in time order, see LazySignal.iter_chunks'''
+        return self.LazyRawSignal(GroupDir, Dataset).iter_chunks(chunk=chunk, overlap=overlap, copy=copy)
+
+    def iter_numerics(self, data_label, chunk='10min', overlap='30s', copy=True):
+        return self.iter_RawSignal('numerics', data_label, chunk=chunk, overlap=overlap, copy=copy)
+
+    def iter_waves(self, data_label, chunk='10min', overlap='30s', copy=True):
+        return self.iter_RawSignal('waves', data_label, chunk=chunk, overlap=overlap, copy=copy)
+
+    def split_label(self, label):
+        '''
+        return (GroupDir, Dataset) of a signal label. label can be explicit (e.g. "waves/ICP")
+        or just the signal name (e.g. "ICP") which is searched in waves then in numerics.
+        '''
+        if '/' in label:
+            return tuple(label.rsplit('/', 1))
+        for GroupDir in ('waves', 'numerics'):
+            if label in self.get_labels(GroupDir):
+                return GroupDir, label
+        raise Exception(f'{label} not found in waves or numerics')
+
+    def get_aligned(self, labels, freq='1s', start=None, end=None, method='interpolate') -> pd.DataFrame:
+        '''
+        Read several raw signals (waves and/or numerics) onto one shared time grid as pd.DataFrame (one column per label).
+        labels: list of signal labels, e.g. ['ICP', 'ABP'] or ['waves/ICP', 'numerics/HR'] (see split_label)
+        freq: grid interval as Timedelta str (e.g. '1s', '10ms') or grid frequency in Hz
+        start/end: grid range, default is from the earliest to the latest sample of all signals
+        method: 'interpolate' (linear interpolation within continuous segments) or 'mean' (average of samples within each grid interval)
+        Grid points within a gap of a signal are NaN. Signals are processed in bounded windows of samples, full-resolution pd.Series are never built.
+        '''
+        if isinstance(labels, str):
+            labels = [labels]
+        signals = [self.LazyRawSignal(*self.split_label(label)) for label in labels]
+        if isinstance(freq, (int, float)):
+            step = int(1e6/freq)
+        else:
+            step = pd.to_timedelta(freq).value // 1000
+        if step <= 0:
+            raise Exception('freq must be a positive interval')
+        non_empty = [sig for sig in signals if len(sig)]
+        if start is None:
+            start = min([sig.StartTime for sig in non_empty], default=None)
+            grid_start = None if start is None else to_unix_us(start) // step * step
+        else:
+            grid_start = to_unix_us(start)
+        if end is None:
+            end = max([sig.EndTime for sig in non_empty], default=None)
+        if grid_start is None or end is None or to_unix_us(end) < grid_start:
+            return pd.DataFrame({label: [] for label in labels}, index=pd.DatetimeIndex([]), dtype='float64')
+        n_grid = (to_unix_us(end) - grid_start) // step + 1
+        out = {label: sig.to_grid(grid_start, step, n_grid, method=method) for label, sig in zip(labels, signals)}
+        return pd.DataFrame(out, index=unix_us2DTidx(grid_start + np.arange(n_grid, dtype='int64')*step))
+
+    def get_DTidx(self, GroupDir, Dataset) -> pd.DatetimeIndex:
+        '''DateTimeIndex of a raw signal built from its .index table'''
+        return self.getDTidx_fromH5Index(self.get(f'{GroupDir}/{Dataset}.index')[()])
     
     @staticmethod
-    def getDTidx_fromH5Index(IndexDF) -> list:
+    def getUnixTime_fromH5Index(IndexDF) -> np.ndarray:
+        '''
+        Extract unix time (int64 microseconds) of every sample of a raw signal (in ICM+ HDF5 format).
+        Blocks with frequency <= 0 are skipped. Timestamps are written in place into a single array (8 bytes per sample).
+        '''
+        if isinstance(IndexDF, pd.DataFrame):
+            IndexDF = IndexDF.to_records(index=False)
+        freq = np.asarray(IndexDF['frequency'], dtype='float64')
+        valid = freq > 0
+        starttime = np.asarray(IndexDF['starttime'], dtype='int64')[valid]
+        length = np.asarray(IndexDF['length'], dtype='int64')[valid]
+        usec_per_sample = (1e6/freq[valid]).astype('int64')
+        # sample offset of each block within the output array
+        blockend = np.cumsum(length)
+        blockstart = blockend - length
+        UnixTime = np.arange(blockend[-1] if len(blockend) else 0, dtype='int64')
+        for start, end, t0, dt in zip(blockstart, blockend, starttime, usec_per_sample):
+            block = UnixTime[start:end]
+            block -= start
+            block *= dt
+            block += t0
+        return UnixTime
+
+    @staticmethod
+    def getDTidx_fromH5Index(IndexDF) -> pd.DatetimeIndex:
         '''Extract DateTimeIndex of a raw signal (in ICM+ HDF5 format)'''
-        if not isinstance(IndexDF, pd.DataFrame):
-            IndexDF = pd.DataFrame(IndexDF)
-        UnixDTidxlist=[]
-        for Index in IndexDF.iterrows():
-            startidx = Index[1].startidx
-            starttime = Index[1].starttime.astype('uint64')
-            length = Index[1].length.astype('uint64')
-            freq = Index[1].frequency
-            if freq <=0:
-                continue
-            usec_per_sample = (1e6/freq).astype('uint64') 
-            endtime = (starttime+usec_per_sample*length).astype('uint64') 
-            timelist = list(range(starttime,endtime,usec_per_sample))
-            checklength = len(timelist) == length
-            if not checklength:
-                print(len(timelist),length)
-            UnixDTidxlist.extend(timelist)
-        return pd.to_datetime(UnixDTidxlist, unit='us')
+        # the unix time array is owned here, so it is rescaled to nanoseconds in place to avoid a copy
+        UnixTime = ICMP_h5py.getUnixTime_fromH5Index(IndexDF)
+        UnixTime *= 1000
+        return pd.DatetimeIndex(UnixTime.view('datetime64[ns]'))
     
+    @staticmethod
+    def getSegmentTime_fromH5Index(IndexDF) -> np.ndarray:
+        '''unix time (int64 microseconds) of the first and last sample of each continuous segment as array of shape (n, 2)'''
+        H5Index = ICMP_h5py.sliceH5Index(IndexDF)
+        if len(H5Index) == 0:
+            return np.empty((0, 2), dtype='int64')
+        segstart = np.r_[0, np.flatnonzero(_H5Index_gaps(H5Index)) + 1]
+        segend = np.r_[segstart[1:] - 1, len(H5Index) - 1]
+        lasttime = H5Index['starttime'] + (H5Index['length'] - 1)*(1e6/H5Index['frequency']).astype('int64')
+        return np.column_stack([H5Index['starttime'][segstart], lasttime[segend]])
+
+    @staticmethod
+    def sliceH5Index(IndexDF, start=None, end=None) -> np.ndarray:
+        '''
+        Trim .index table of a raw signal to the samples within [start, end] (both inclusive, None for unbounded).
+        Blocks with frequency <= 0 or outside the window are dropped, the remaining blocks have startidx, starttime and length
+        shifted to the first/last sample in the window. The output can be passed to getUnixTime_fromH5Index and readH5Index_samples.
+        '''
+        if isinstance(IndexDF, pd.DataFrame):
+            IndexDF = IndexDF.to_records(index=False)
+        freq = np.asarray(IndexDF['frequency'], dtype='float64')
+        valid = freq > 0
+        freq = freq[valid]
+        startidx = np.asarray(IndexDF['startidx'], dtype='int64')[valid]
+        starttime = np.asarray(IndexDF['starttime'], dtype='int64')[valid]
+        length = np.asarray(IndexDF['length'], dtype='int64')[valid]
+        usec_per_sample = (1e6/freq).astype('int64')
+        first = np.zeros_like(length)
+        last = length.copy()
+        if start is not None:
+            # first sample at or after start (ceiling division)
+            first = np.clip(-((starttime - to_unix_us(start)) // usec_per_sample), 0, length)
+        if end is not None:
+            # one past the last sample at or before end
+            last = np.clip((to_unix_us(end) - starttime) // usec_per_sample + 1, 0, length)
+        return _trimH5Index(startidx, starttime, freq, first, last)
+
+    @staticmethod
+    def readH5Index_samples(H5Dataset, H5Index) -> np.ndarray:
+        '''
+        Read the samples referenced by an .index table (e.g. output of sliceH5Index) from a h5py.Dataset.
+        Only the hyperslab spanning the referenced blocks is read from file.
+        '''
+        if len(H5Index) == 0:
+            return H5Dataset[0:0]
+        startidx = np.asarray(H5Index['startidx'], dtype='int64')
+        length = np.asarray(H5Index['length'], dtype='int64')
+        slab_start = startidx.min()
+        slab = H5Dataset[slab_start:(startidx + length).max()]
+        offset = startidx - slab_start
+        blockend = np.cumsum(length)
+        if (offset == blockend - length).all():
+            # blocks are stored back to back in the dataset
+            return slab[:blockend[-1]]
+        return np.concatenate([slab[o:o+n] for o, n in zip(offset, length)])
+
     @property
     def FileAttribute(self):        
-        fileAttrList = list(self.get('/').attrs.items())
-        fileAttrDict = {i[0]:i[1][0] for i in fileAttrList}
-        return fileAttrDict   
+        return self.catalog['attributes']
         
     @property
     def ICMPVersion(self):
@@ -100,11 +374,11 @@ class ICMP_h5py(h5py.File):
 
     @property       
     def RecordingStartTime(self):
-        return pd.to_datetime(self.FileAttribute['dataStartTime'].replace('.',':'))
+        return self.catalog['RecordingStartTime']
 
     @property       
     def RecordingEndTime(self):
-        return pd.to_datetime(self.FileAttribute['dataEndTime'].replace('.',':'))
+        return self.catalog['RecordingEndTime']
 
     @property       
     def RecordingDuration(self):
@@ -117,16 +391,16 @@ class ICMP_h5py(h5py.File):
         print(f'Overall recording ended at: {self.RecordingEndTime}')
         print(f'Overall recording duration: {self.RecordingDuration}')
 
+    @staticmethod
+    def _get_labels(names, parent_group):
+        return [x.split('/')[1] for x in names if (f"{parent_group}/" in x) and ("." not in x)]
+
     def get_labels(self, parent_group):
-        out_lst = []
-        self.visit(lambda x: out_lst.append(x.split('/')[1]) if (f"{parent_group}/" in x) and ("." not in x) else None)
-        return out_lst
+        return self._get_labels(self.catalog['names'], parent_group)
     
     def dataset_list(self):
         '''output a list of dataset in hdf5 file'''
-        keys = []
-        self.visit(lambda key : keys.append(key) if isinstance(self[key], h5py.Dataset) else None)
-        return keys
+        return list(self.catalog['datasets'].keys())
 
     @property
     def waves_label(self):
@@ -136,4 +410,210 @@ class ICMP_h5py(h5py.File):
     @property
     def numerics_label(self):
         '''output all labels in waves as list'''
-        return self.get_labels('numerics')
\ No newline at end of file
+        return self.get_labels('numerics')
+
+
+class LazySignal:
+    '''
+    Lazy handle of a raw signal (waves/numerics) in an ICM+ HDF5 file. Nothing but the .index table is read on creation.
+    Slice by sample position (sig[i:j]) or by time (sig['2024-03-01 10:00':'2024-03-01 10:10']) to get a pd.Series.
+    Sample positions count the samples of all blocks with frequency > 0 back to back, same as the rows of get_waves/get_numerics.
+    Contiguous uncompressed datasets are read through numpy.memmap, others fall back to h5py hyperslab reads.
+    Only .values is zero-copy, reads return writable copies unless copy=False is given (read_array, iter_chunks), which returns read-only memmap slices.
+    '''
+
+    def __init__(self, H5File, GroupDir, Dataset):
+        self.name = Dataset
+        self.H5Dataset = H5File.get(f'{GroupDir}/{Dataset}')
+        if self.H5Dataset is None:
+            raise Exception(f'Unable to find {GroupDir}/{Dataset}')
+        self.H5Index = ICMP_h5py.sliceH5Index(H5File.get(f'{GroupDir}/{Dataset}.index')[()])
+        self._blockend = np.cumsum(self.H5Index['length'])
+        self._usec_per_sample = (1e6/self.H5Index['frequency']).astype('int64')
+        self._memmap = self._get_memmap(H5File, self.H5Dataset)
+
+    @staticmethod
+    def _get_memmap(H5File, H5Dataset):
+        '''memory map a contiguous and uncompressed dataset, return None if not possible'''
+        if H5Dataset.chunks is not None or H5Dataset.compression is not None or H5File.driver not in ('sec2', 'stdio'):
+            return None
+        offset = H5Dataset.id.get_offset()
+        if offset is None or H5Dataset.size == 0:
+            return None
+        try:
+            return np.memmap(H5File.filename, dtype=H5Dataset.dtype, mode='r', offset=offset, shape=H5Dataset.shape)
+        except:
+            return None
+
+    @property
+    def is_memmap(self) -> bool:
+        return self._memmap is not None
+
+    @property
+    def values(self):
+        '''underlying data, np.memmap if memory mapped otherwise the h5py.Dataset'''
+        return self.H5Dataset if self._memmap is None else self._memmap
+
+    def __len__(self):
+        return int(self._blockend[-1]) if len(self._blockend) else 0
+
+    def __repr__(self):
+        return f'LazySignal({self.name}, samples={len(self)}, blocks={len(self.H5Index)}, memmap={self.is_memmap})'
+
+    @property
+    def StartTime(self) -> pd.Timestamp:
+        return self.time_at(0)
+
+    @property
+    def EndTime(self) -> pd.Timestamp:
+        return self.time_at(len(self) - 1)
+
+    @property
+    def DTidx(self) -> pd.DatetimeIndex:
+        '''DatetimeIndex of every sample (8 bytes per sample)'''
+        return ICMP_h5py.getDTidx_fromH5Index(self.H5Index)
+
+    def time_at(self, position):
+        '''timestamp(s) of sample position(s)'''
+        position = np.asarray(position, dtype='int64')
+        block = np.searchsorted(self._blockend, position, side='right')
+        if (position < 0).any() or (block >= len(self._blockend)).any():
+            raise IndexError('sample position out of range')
+        UnixTime = self.H5Index['starttime'][block] + (position - self._blockend[block] + self.H5Index['length'][block])*self._usec_per_sample[block]
+        DTidx = unix_us2DTidx(np.atleast_1d(UnixTime))
+        return DTidx[0] if position.ndim == 0 else DTidx
+
+    def position_at(self, DT, side='left'):
+        '''
+        sample position of a timestamp. side='left' gives the first sample at or after DT, side='right' the first sample after DT.
+        Timestamps within a gap map to the first sample of the next block.
+        '''
+        UnixTime = to_unix_us(DT)
+        starttime = self.H5Index['starttime']
+        length = self.H5Index['length']
+        block = max(np.searchsorted(starttime, UnixTime, side='right') - 1, 0)
+        if block >= len(starttime):
+            return 0
+        offset = UnixTime - starttime[block]
+        if side == 'left':
+            offset = -(-offset // self._usec_per_sample[block])
+        else:
+            offset = offset // self._usec_per_sample[block] + 1
+        return int(self._blockend[block] - length[block] + np.clip(offset, 0, length[block]))
+
+    def _slice_position(self, start=None, stop=None) -> np.ndarray:
+        '''.index table of the samples at positions [start, stop)'''
+        start, stop, _ = slice(start, stop).indices(len(self))
+        length = self.H5Index['length']
+        blockstart = self._blockend - length
+        first = np.clip(start - blockstart, 0, length)
+        last = np.clip(stop - blockstart, 0, length)
+        return _trimH5Index(self.H5Index['startidx'], self.H5Index['starttime'], self.H5Index['frequency'], first, last)
+
+    def _read_samples(self, H5Index, copy=True) -> np.ndarray:
+        '''samples referenced by a (trimmed) .index table as np.ndarray, a slice of the read-only memmap is copied unless copy is False'''
+        values = np.asarray(ICMP_h5py.readH5Index_samples(self.values, H5Index))
+        return values.copy() if copy and not values.flags.writeable else values
+
+    def read(self, H5Index) -> pd.Series:
+        '''read the samples referenced by a (trimmed) .index table as pd.Series'''
+        return pd.Series(self._read_samples(H5Index), index=ICMP_h5py.getDTidx_fromH5Index(H5Index), name=self.name, copy=False)
+
+    def read_array(self, start=None, stop=None, copy=True):
+        '''read samples by position [start, stop) as (unix time in microseconds, values) np.ndarray, values may be a read-only memmap slice if copy is False'''
+        H5Index = self._slice_position(start, stop)
+        return ICMP_h5py.getUnixTime_fromH5Index(H5Index), self._read_samples(H5Index, copy=copy)
+
+    def iloc(self, start=None, stop=None) -> pd.Series:
+        '''read samples by position [start, stop)'''
+        return self.read(self._slice_position(start, stop))
+
+    def loc(self, start=None, end=None) -> pd.Series:
+        '''read samples by time [start, end] (both inclusive)'''
+        return self.read(ICMP_h5py.sliceH5Index(self.H5Index, start, end))
+
+    def __getitem__(self, key) -> pd.Series:
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('LazySignal only supports slicing without step, e.g. sig[i:j] or sig[start_time:end_time]')
+        if all(k is None or isinstance(k, (int, np.integer)) for k in (key.start, key.stop)):
+            return self.iloc(key.start, key.stop)
+        return self.loc(key.start, key.stop)
+
+    def segments(self) -> np.ndarray:
+        '''
+        Continuous segments of the signal as array of [start, stop) sample positions.
+        Consecutive blocks are joined if the next block starts right after the previous one at the same frequency, otherwise there is a gap.
+        '''
+        starttime = self.H5Index['starttime']
+        if len(starttime) == 0:
+            return np.empty((0, 2), dtype='int64')
+        blockstart = self._blockend - self.H5Index['length']
+        IsGap = _H5Index_gaps(self.H5Index)
+        segstart = np.r_[0, np.flatnonzero(IsGap) + 1].astype('int64')
+        segend = np.r_[segstart[1:] - 1, len(starttime) - 1].astype('int64')
+        return np.column_stack([blockstart[segstart], self._blockend[segend]])
+
+    def iter_chunks(self, chunk='10min', overlap='30s', copy=True):
+        '''
+        Generator of (DatetimeIndex, np.ndarray) chunks in time order, only one chunk is held in memory at a time.
+        Each chunk is a writable copy, or a read-only memmap slice if copy is False (e.g. for read-only use or Artf_DataFrame.mask_chunks, which copies itself).
+        Each continuous segment (see segments) is cut into chunks of duration "chunk", each chunk also include the preceding "overlap" of the same segment.
+        Chunks never span across a gap, so the last chunk of a segment can be shorter.
+        '''
+        chunk = pd.to_timedelta(chunk)
+        overlap = pd.to_timedelta(overlap)
+        if overlap >= chunk:
+            raise Exception('overlap must be shorter than chunk')
+        chunk_us = chunk.value // 1000
+        overlap_us = overlap.value // 1000
+        for segstart, segend in self.segments():
+            usec_per_sample = self._usec_per_sample[np.searchsorted(self._blockend, segstart, side='right')]
+            n_chunk = max(int(chunk_us // usec_per_sample), 1)
+            n_overlap = int(overlap_us // usec_per_sample)
+            for position in range(segstart, segend, n_chunk):
+                H5Index = self._slice_position(max(position - n_overlap, segstart), min(position + n_chunk, segend))
+                yield ICMP_h5py.getDTidx_fromH5Index(H5Index), self._read_samples(H5Index, copy=copy)
+
+    def to_grid(self, grid_start, step, n_grid, method='interpolate') -> np.ndarray:
+        '''
+        Resample the signal onto a time grid (grid_start + k*step for k in range(n_grid), unix time in microseconds) as float64 np.ndarray.
+        method='interpolate' linearly interpolates within continuous segments, method='mean' averages the samples within [grid_k, grid_k+1).
+        Grid points without samples (gaps) are NaN. Samples are read _grid_window at a time.
+        '''
+        if method not in ('interpolate', 'mean'):
+            raise Exception('method must be "interpolate" or "mean"')
+        grid_end = grid_start + (n_grid - 1)*step
+        out = np.full(n_grid, np.nan)
+        if method == 'mean':
+            sums = np.zeros(n_grid)
+            counts = np.zeros(n_grid)
+        if len(self) == 0 or n_grid <= 0:
+            return out
+        # only read samples within the grid (plus one sample either side for interpolation)
+        first = max(self.position_at(unix_us2DTidx([grid_start])[0]) - 1, 0)
+        last = self.position_at(unix_us2DTidx([grid_end + step])[0]) + 1
+        for segstart, segend in self.segments():
+            segstart, segend = max(segstart, first), min(segend, last)
+            for position in range(segstart, segend, _grid_window):
+                if method == 'interpolate':
+                    # overlap one sample with the next window so no grid point between windows is skipped
+                    UnixTime, values = self.read_array(position, min(position + _grid_window + 1, segend), copy=False)
+                    g0 = max(-((grid_start - UnixTime[0]) // step), 0)
+                    g1 = min((UnixTime[-1] - grid_start) // step, n_grid - 1)
+                    if g1 >= g0:
+                        GridTime = grid_start + np.arange(g0, g1 + 1, dtype='int64')*step
+                        out[g0:g1 + 1] = np.interp(GridTime, UnixTime, values.astype('float64'))
+                else:
+                    UnixTime, values = self.read_array(position, min(position + _grid_window, segend), copy=False)
+                    values = values.astype('float64')
+                    grid_pos = (UnixTime - grid_start) // step
+                    valid = (grid_pos >= 0) & (grid_pos < n_grid) & ~np.isnan(values)
+                    if valid.any():
+                        grid_pos = grid_pos[valid]
+                        g0 = grid_pos.min()
+                        g1 = grid_pos.max() + 1
+                        sums[g0:g1] += np.bincount(grid_pos - g0, weights=values[valid], minlength=g1 - g0)
+                        counts[g0:g1] += np.bincount(grid_pos - g0, minlength=g1 - g0)
+        if method == 'mean':
+            np.divide(sums, counts, out=out, where=counts > 0)
+        return out
@@ -1,13 +1,54 @@
 import pandas as pd
+import numpy as np
 import h5py
-from ._utility import _Trend_h5dir, Ser2DT, DT2Ser, Path
+import operator
+import warnings
+from ._utility import _Trend_h5dir, Ser2DT, DT2Ser, str2DT, Path
 from .Episode import Episode_Dataframe
 
+# comparators accepted in episode_sweep rules
+_Comparators = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le, '==': operator.eq, '!=': operator.ne}
+
+# tolerance of serial datetime (in days) when locating rows by time, 1ms
+_Serial_tolerance = 1e-3/86400
+
+def _bisect_h5(H5Dataset, field, value, side='left') -> int:
+    '''binary search a sorted field of a compound h5py.Dataset, reading one row per step instead of the whole field'''
+    column = H5Dataset.fields(field)
+    low, high = 0, H5Dataset.shape[0]
+    while low < high:
+        mid = (low + high) // 2
+        row_value = column[mid]
+        if row_value < value or (side == 'right' and row_value == value):
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+def _getEpisodeBound(EpisodeDT:np.ndarray, MAX_TIME_GAP):
+    '''return start and end (np.datetime64 arrays) of each run in sorted EpisodeDT, a new run starts after every time gap >= MAX_TIME_GAP'''
+    # Ideally maximum time gap should be 1min (since minutely average trend), a higher maximum will join closely adjacent period 
+    if len(EpisodeDT) == 0:
+        return EpisodeDT[:0], EpisodeDT[:0]
+    IsDiscontinuous = np.diff(EpisodeDT) >= pd.to_timedelta(MAX_TIME_GAP).to_timedelta64()
+    BreakIdx = np.flatnonzero(IsDiscontinuous)
+    return EpisodeDT[np.r_[0, BreakIdx + 1]], EpisodeDT[np.r_[BreakIdx, len(EpisodeDT) - 1]]
+
+def _getIntervalAUC(DTvalues:np.ndarray, value:np.ndarray, MAX_TIME_GAP) -> np.ndarray:
+    '''AUC (value unit*hrs) of each interval between consecutive samples with trapezoidal rule, NaN across disconnection (time gap >= MAX_TIME_GAP)'''
+    dt = np.diff(DTvalues)   # change of time 
+    dt_hr = dt/np.timedelta64(1, 'h')  # change of time (convert unit to hours)
+    auc = (value[1:] + value[:-1])*dt_hr/2 # Area under curve mmHg*hrs using trapezoidal rule  
+    # only include data that's MAX_TIME_GAP apart to exclude auc value calculate across disconnection
+    auc[dt >= pd.to_timedelta(MAX_TIME_GAP).to_timedelta64()] = float('nan')
+    return auc
+
 def getTrendEpisodeDF(IsInEpisodeSeries:pd.Series, MAX_TIME_GAP='5min',MIN_EPISODE_DURATION='5min') -> pd.DataFrame:  
     '''
     Extract continuous episodes within a time list (usually datetimeindex from time series)
     MAX_TIME_GAP: Closely adjacent periods with time gap < MAX_TIME_GAP will be treated as a single period. Tolerance for short resolution.
     MIN_EPISODE_DURATION: Filter out episode with duration < MIN_EPISODE_DURATION
+    Each episode starts and ends at the first and last timestamp of a run (the final run included).
     '''
     if isinstance(MAX_TIME_GAP, str):
         '''attempt converting to Timedelta if arg is str'''
@@ -20,28 +61,13 @@ def getTrendEpisodeDF(IsInEpisodeSeries:pd.Series, MAX_TIME_GAP='5min',MIN_EPISO
     if IsInEpisodeSeries.dtype != bool:
         IsInEpisodeSeries = IsInEpisodeSeries.astype(bool)
 
-    EpisodeDTList = IsInEpisodeSeries[IsInEpisodeSeries].index
-    EpisodeDatetimeDict = {'StartDatetime':[],'DurationTimedelta':[],'EndDatetime':[]}       
-    # reduce processing time by early return if EpisodeDTList is empty (avoid for loop)
+    EpisodeDTList = pd.DatetimeIndex(IsInEpisodeSeries.index[IsInEpisodeSeries.to_numpy()])
+    # reduce processing time by early return if EpisodeDTList is empty
     if len(EpisodeDTList) ==0:
         return Episode_Dataframe()
-    EpiStartDT = LastDT = EpisodeDTList[0]
-    for CurrentDT in EpisodeDTList[1::]:
-        TIntervalDT = CurrentDT-LastDT
-        # Ideally maximum time gap should be 1min (since minutely average trend), a higher maximum will join closely adjacent period 
-        IsContinuous = TIntervalDT<MAX_TIME_GAP 
-        #Start new episode if not continuous or if reached end of trend data
-        if not IsContinuous or CurrentDT==EpisodeDTList[-1]:  
-            EpiEndDT = LastDT    
-            EpiDuration = EpiEndDT-EpiStartDT
-            EpisodeDatetimeDict['StartDatetime'].append(EpiStartDT)
-            EpisodeDatetimeDict['DurationTimedelta'].append(EpiDuration)
-            EpisodeDatetimeDict['EndDatetime'].append(EpiEndDT)                                                
-            # if abnormal value is not continuous then start a new potential episode 
-            EpiStartDT = CurrentDT 
-        # update LastDT for next iteration 
-        LastDT = CurrentDT 
-    EpisodeDatetimeDF = Episode_Dataframe(EpisodeDatetimeDict)
+    EpiStartDT, EpiEndDT = _getEpisodeBound(EpisodeDTList.values, MAX_TIME_GAP)
+    EpiStartDT, EpiEndDT = pd.DatetimeIndex(EpiStartDT), pd.DatetimeIndex(EpiEndDT)
+    EpisodeDatetimeDF = Episode_Dataframe({'StartDatetime':EpiStartDT,'DurationTimedelta':EpiEndDT - EpiStartDT,'EndDatetime':EpiEndDT})
     # exclude period where duration is less then minimum duration of an episode
     if not EpisodeDatetimeDF.empty and isinstance(MIN_EPISODE_DURATION, pd.Timedelta):
         ValidPeriod = EpisodeDatetimeDF['DurationTimedelta'] > MIN_EPISODE_DURATION
@@ -65,35 +91,34 @@ class Trend_Series(pd.Series):
     def get_episode(self, *args, **kwargs):
         return getTrendEpisodeDF(self, *args, **kwargs)
     
-    def trapzoidal_auc(self, target_thres=None, IsUnderCurve:bool= False):
+    def trapzoidal_auc(self, target_thres=None, IsUnderCurve:bool= False, MAX_TIME_GAP='62s'):
         '''
         calculate AUC with trapzoidal rule. if target_thres has numerical value, then calculate value exceeding the threshold before calculating burden.
-        Note! this function accept datetimeidx and assess continuity by 1min interval (interval exceed 1 min will assumed discoutinuous)
+        Note! this function accept datetimeidx and assess continuity by MAX_TIME_GAP (default ~1min, interval >= MAX_TIME_GAP assumed discoutinuous)
+        AUC of each interval (value unit*hrs) is recorded at the start of the interval, the last entry and intervals across a disconnection are NaN.
         '''
-        curve=self.copy()
-        if target_thres!=None and isinstance(target_thres,(float,int)):
+        curve = self.astype('float64')
+        if target_thres is not None and isinstance(target_thres,(float,int,np.number)):
             if IsUnderCurve:
                 curve = target_thres - curve
             else:
                 curve = curve - target_thres
             curve = curve.where(curve>0)
-        AUC_Series = curve*float('nan') 
-        time1=curve.index[0]
-        value1=curve[time1]
-        dt_1hr=pd.to_timedelta('0day 01:00:00')
-        for time2 in curve.index[1:]:
-            value2 = curve[time2]
-            dt = time2-time1   # change of time 
-            dt_hr = dt/dt_1hr  # change of time (convert unit to hours)
-            dv = value2+value1 
-            auc = (dv*dt_hr)/2 # Area under curve mmHg*hrs using trapezoidal rule  
-            # check if data is continuous/connection
-            if dt<pd.to_timedelta('0day 00:01:02'):   
-                AUC_Series[time1]=auc   # only include data that's 1 min apart to exclude auc value calculate across disconnection (>1 min)
-            # update previous time and data value
-            time1 = time2
-            value1 = value2
-        return AUC_Series.rename(f'{self.name}_burden')
+        value = curve.to_numpy()
+        AUC = np.full(len(value), float('nan'))
+        AUC[:-1] = _getIntervalAUC(pd.DatetimeIndex(curve.index).values, value, MAX_TIME_GAP)
+        return Trend_Series(AUC, index=curve.index, name=f'{self.name}_burden')
+
+    def burden_summary(self, target_thres=None, IsUnderCurve:bool= False, MAX_TIME_GAP='62s', freq=('1h','1D')) -> dict:
+        '''
+        aggregate trapzoidal_auc into total burden and burden per period (default hourly and daily, by start of each interval).
+        Return dict {'total': float, '1h': pd.Series, '1D': pd.Series} with one key per freq.
+        '''
+        AUC = self.trapzoidal_auc(target_thres=target_thres, IsUnderCurve=IsUnderCurve, MAX_TIME_GAP=MAX_TIME_GAP)
+        BurdenDict = {'total': float(np.nansum(AUC.to_numpy()))}
+        for period in ([freq] if isinstance(freq, str) else freq):
+            BurdenDict[period] = pd.Series(AUC).resample(period).sum()
+        return BurdenDict
 
 
 class Trend_DataFrame(pd.DataFrame):
@@ -108,25 +133,30 @@ class Trend_DataFrame(pd.DataFrame):
         '''Overwrite internal method for compatibility'''
         return Trend_Series
 
-    def __init__(self, data=None, convert_dtidx = False, drop_index_col = False, dtidx_col_rename = {'datetime':'DateTime'}, **kwargs) -> None:
+    def __init__(self, data=None, convert_dtidx = False, drop_index_col = False, dtidx_col_rename = {'datetime':'DateTime'}, usecols = None, start = None, end = None, **kwargs) -> None:
         '''
         Accept directory of ICM+ generated event file in the following formats (csv, txt, xml, hdf5)        
+        usecols: only load these columns (names without the unit bracket, e.g. ['ICP','CPP']), DateTime is always loaded.
+        start/end: only load rows with DateTime within [start, end]. For HDF5 file, only the requested fields and rows are read from file.
         '''
-        if Path(data).is_file():
-            TrendFile_dir = data
+        if isinstance(data, (str, Path)) and Path(data).is_file():
+            TrendFile_dir = str(data)
             TrendFileType = TrendFile_dir.split("\\")[-1].split(".")[-1]
+            ColFilter = None if usecols is None else lambda col: col.split('[')[0] in usecols or col.split('[')[0] == 'DateTime'
 
             if TrendFileType == 'hdf5':       
                 try:
-                    _TrendDF = pd.DataFrame(h5py.File(TrendFile_dir, 'r').get(_Trend_h5dir)[()])  #Orignial trend data (default in minutes) from the hdf5 file
+                    with h5py.File(TrendFile_dir, 'r') as H5File:
+                        #Orignial trend data (default in minutes) from the hdf5 file
+                        _TrendDF = self.read_h5_trend(H5File.get(_Trend_h5dir), dt_field = list(dtidx_col_rename.keys())[0], columns = usecols, start = start, end = end)
                     _TrendDF = _TrendDF.rename(columns = dtidx_col_rename)
                     convert_dtidx = True
-                except:
-                    raise Exception(f'Trend file not found in HDF5 file or {TrendFile_dir}')
+                except Exception as e:
+                    raise Exception(f'Trend file not found in HDF5 file or {TrendFile_dir}') from e
             elif TrendFileType == 'csv': 
-                _TrendDF = pd.read_csv(TrendFile_dir)       
+                _TrendDF = pd.read_csv(TrendFile_dir, usecols = ColFilter)       
             elif TrendFileType == 'xlsx': 
-                _TrendDF = pd.read_excel(TrendFile_dir)
+                _TrendDF = pd.read_excel(TrendFile_dir, usecols = ColFilter)
             else:
                 raise Exception('Trend data file directory invalid')
             #remove sqaure brackets that incidate the unit
@@ -134,17 +164,184 @@ class Trend_DataFrame(pd.DataFrame):
             #Change DateTime data type from str to pd.DataTime
             dtidx_col = 'DateTime' #dtidx_col_rename.popitem()
             if convert_dtidx:
-                _TrendDF[dtidx_col] = _TrendDF[dtidx_col].apply(Ser2DT)
-            elif type(_TrendDF[dtidx_col][0]) == str:
-                _TrendDF[dtidx_col] = [pd.to_datetime(strDT, dayfirst=True) for strDT in _TrendDF['DateTime']]
+                _TrendDF[dtidx_col] = Ser2DT(_TrendDF[dtidx_col])
+            elif len(_TrendDF) and type(_TrendDF[dtidx_col][0]) == str:
+                _TrendDF[dtidx_col] = str2DT(_TrendDF[dtidx_col], dayfirst=True)
+            if TrendFileType != 'hdf5' and (start is not None or end is not None):
+                InWindow = pd.Series(True, index=_TrendDF.index)
+                if start is not None:
+                    InWindow &= _TrendDF[dtidx_col] >= pd.Timestamp(start)
+                if end is not None:
+                    InWindow &= _TrendDF[dtidx_col] <= pd.Timestamp(end)
+                _TrendDF = _TrendDF[InWindow]
             super().__init__(_TrendDF.set_index('DateTime',drop=drop_index_col),**kwargs)
         else:
             super().__init__(data=data,**kwargs)
         
+    @staticmethod
+    def read_h5_trend(H5Dataset, dt_field = 'datetime', columns = None, start = None, end = None) -> pd.DataFrame:
+        '''
+        read trend compound dataset (summaries/minutes) from HDF5 file as pd.DataFrame (column names and serial DateTime unchanged).
+        columns: only read these fields (names without the unit bracket), dt_field is always read.
+        start/end: only read rows within [start, end], located by binary search on the sorted serial DateTime field.
+        Rows within 1ms of start/end are included to absorb the rounding error of serial datetime.
+        '''
+        row_start, row_end = 0, H5Dataset.shape[0]
+        if start is not None:
+            row_start = _bisect_h5(H5Dataset, dt_field, DT2Ser(pd.Timestamp(start)) - _Serial_tolerance, side='left')
+        if end is not None:
+            row_end = _bisect_h5(H5Dataset, dt_field, DT2Ser(pd.Timestamp(end)) + _Serial_tolerance, side='right')
+        row_end = max(row_start, row_end)
+        if columns is None:
+            return pd.DataFrame(H5Dataset[row_start:row_end])
+        fields = [field for field in H5Dataset.dtype.names if field == dt_field or field.split('[')[0] in columns]
+        missing = set(columns) - {field.split('[')[0] for field in fields}
+        if missing:
+            raise Exception(f'{sorted(missing)} not found in trend data')
+        return pd.DataFrame(H5Dataset.fields(fields)[row_start:row_end])
+
+    def episode_sweep(self, spec, MAX_TIME_GAP='5min', MIN_EPISODE_DURATION='5min') -> Episode_Dataframe:
+        '''
+        Extract episodes for many threshold rules in one call (see getTrendEpisodeDF), e.g. spec = [('ICP','>',20), ('ICP','>',22), ('CPP','<',60,'5min','10min')]
+        spec: list of rules, each a tuple (column, comparator, threshold[, MAX_TIME_GAP[, MIN_EPISODE_DURATION]]) or a dict with these keys.
+        comparator: one of '>', '>=', '<', '<=', '==', '!='. MAX_TIME_GAP/MIN_EPISODE_DURATION are the defaults for rules not specifying them.
+        The time index and each column are converted to np.ndarray once and shared by all rules.
+        Return one Episode_Dataframe with columns rule (e.g. "ICP>20"), column, comparator, threshold, StartDatetime, DurationTimedelta, EndDatetime.
+        '''
+        keys = ['column', 'comparator', 'threshold', 'MAX_TIME_GAP', 'MIN_EPISODE_DURATION']
+        DTvalues = pd.DatetimeIndex(self.index).values
+        ColumnValues = {}
+        EpisodeDict = {'rule':[], 'column':[], 'comparator':[], 'threshold':[], 'StartDatetime':[], 'EndDatetime':[]}
+        for rule in spec:
+            rule = dict(rule) if isinstance(rule, dict) else dict(zip(keys, rule))
+            column, comparator, threshold = rule['column'], rule['comparator'], rule['threshold']
+            if comparator not in _Comparators:
+                raise Exception(f'comparator must be one of {list(_Comparators)}, got {comparator}')
+            if column not in ColumnValues:
+                ColumnValues[column] = self[column].to_numpy()
+            IsInEpisode = _Comparators[comparator](ColumnValues[column], threshold)
+            EpiStartDT, EpiEndDT = _getEpisodeBound(DTvalues[IsInEpisode], rule.get('MAX_TIME_GAP', MAX_TIME_GAP))
+            MinDuration = rule.get('MIN_EPISODE_DURATION', MIN_EPISODE_DURATION)
+            if MinDuration is not None:
+                ValidPeriod = (EpiEndDT - EpiStartDT) > pd.to_timedelta(MinDuration).to_timedelta64()
+                EpiStartDT, EpiEndDT = EpiStartDT[ValidPeriod], EpiEndDT[ValidPeriod]
+            n_episode = len(EpiStartDT)
+            EpisodeDict['rule'].append(np.full(n_episode, f'{column}{comparator}{threshold}', dtype=object))
+            EpisodeDict['column'].append(np.full(n_episode, column, dtype=object))
+            EpisodeDict['comparator'].append(np.full(n_episode, comparator, dtype=object))
+            EpisodeDict['threshold'].append(np.full(n_episode, threshold))
+            EpisodeDict['StartDatetime'].append(EpiStartDT)
+            EpisodeDict['EndDatetime'].append(EpiEndDT)
+        if not EpisodeDict['rule']:
+            return Episode_Dataframe()
+        EpisodeDict = {k: np.concatenate(v) for k, v in EpisodeDict.items()}
+        EpisodeDict['DurationTimedelta'] = EpisodeDict['EndDatetime'] - EpisodeDict['StartDatetime']
+        return Episode_Dataframe(EpisodeDict, columns=['rule','column','comparator','threshold','StartDatetime','DurationTimedelta','EndDatetime'])
 
     @staticmethod
     def remove_col_bracket(DF, delimiter = '['):
         '''rename column name by getting the str before a certain limiter e.g. sqaure bracket "[" '''
         return DF.rename(lambda col:col.split(delimiter)[0],axis='columns')   
     
-    
\ No newline at end of file
+    
+
+
+class Burden_Accumulator:
+    '''
+    Running threshold-exceedance burden (same quantity as Trend_Series.trapzoidal_auc) updated as new trend rows arrive, e.g. from a live ICM+ feed.
+    rules: {column: threshold or [threshold, ...]} where threshold is a number (burden above) or a tuple (number, IsUnderCurve) e.g. {'ICP': [20, 25], 'CPP': [(60, True)]}
+    windows: durations of the windowed burden (sum of intervals starting within the window before the latest row)
+    Each update costs O(rows) and the total needs O(1) state per rule. Windowed burden keeps the non-zero intervals within the longest window.
+    '''
+
+    def __init__(self, rules, windows=('1h', '6h', '24h'), MAX_TIME_GAP='62s'):
+        self.MAX_TIME_GAP = pd.to_timedelta(MAX_TIME_GAP)
+        self.windows = [str(w) for w in windows]
+        self._window_td = [pd.to_timedelta(w).to_timedelta64() for w in windows]
+        self.rules = {}
+        for column, thresholds in rules.items():
+            for threshold in (thresholds if isinstance(thresholds, list) else [thresholds]):
+                threshold, IsUnderCurve = threshold if isinstance(threshold, tuple) else (threshold, False)
+                self.rules[f"{column}{'<' if IsUnderCurve else '>'}{threshold}"] = (column, threshold, IsUnderCurve)
+        self.LastDT = None
+        # per rule state: last time and value, running total, non-zero intervals (start, auc) with one pointer and running sum per window
+        self._last = {rule: (None, float('nan')) for rule in self.rules}
+        self._total = {rule: 0.0 for rule in self.rules}
+        self._intervals = {rule: ([], []) for rule in self.rules}
+        self._window_pos = {rule: [0]*len(self.windows) for rule in self.rules}
+        self._window_sum = {rule: [0.0]*len(self.windows) for rule in self.rules}
+
+    def __repr__(self):
+        return f'Burden_Accumulator(rules={list(self.rules)}, windows={self.windows}, LastDT={self.LastDT})'
+
+    def update(self, TrendDF):
+        '''add new rows (Trend_DataFrame or pd.DataFrame with DatetimeIndex, in time order), rows not after the previous update are ignored'''
+        DTvalues = pd.DatetimeIndex(TrendDF.index).values
+        if self.LastDT is not None:
+            IsNew = DTvalues > self.LastDT
+            if not IsNew.all():
+                warnings.warn(f'{(~IsNew).sum()} rows not after {pd.Timestamp(self.LastDT)} are ignored')
+                TrendDF, DTvalues = TrendDF[IsNew], DTvalues[IsNew]
+        if len(DTvalues) == 0:
+            return self
+        for rule, (column, threshold, IsUnderCurve) in self.rules.items():
+            if column not in TrendDF.columns:
+                continue
+            value = TrendDF[column].to_numpy(dtype='float64')
+            excess = threshold - value if IsUnderCurve else value - threshold
+            excess[~(excess > 0)] = float('nan')
+            LastRuleDT, LastExcess = self._last[rule]
+            if LastRuleDT is not None:
+                RuleDT, excess_all = np.r_[LastRuleDT, DTvalues], np.r_[LastExcess, excess]
+            else:
+                RuleDT, excess_all = DTvalues, excess
+            auc = _getIntervalAUC(RuleDT, excess_all, self.MAX_TIME_GAP)
+            IsBurden = auc > 0
+            BatchBurden = float(auc[IsBurden].sum())
+            self._total[rule] += BatchBurden
+            self._intervals[rule][0].extend(RuleDT[:-1][IsBurden])
+            self._intervals[rule][1].extend(auc[IsBurden])
+            self._window_sum[rule] = [w + BatchBurden for w in self._window_sum[rule]]
+            self._last[rule] = (DTvalues[-1], excess[-1])
+        self.LastDT = DTvalues[-1]
+        self._evict()
+        return self
+
+    def update_row(self, DT, values:dict):
+        '''add a single row, values is {column: value}'''
+        return self.update(pd.DataFrame(values, index=pd.DatetimeIndex([DT])))
+
+    def _evict(self):
+        '''drop intervals that started before each window, keep only the intervals within the longest window'''
+        for rule in self.rules:
+            IntervalDT, IntervalAUC = self._intervals[rule]
+            positions = self._window_pos[rule]
+            sums = self._window_sum[rule]
+            for i, window in enumerate(self._window_td):
+                WindowStart = self.LastDT - window
+                while positions[i] < len(IntervalDT) and IntervalDT[positions[i]] <= WindowStart:
+                    sums[i] -= IntervalAUC[positions[i]]
+                    positions[i] += 1
+                if positions[i] == len(IntervalDT):
+                    # reset running sum of empty window to avoid accumulating rounding error
+                    sums[i] = 0.0
+            n_drop = min(positions, default=len(IntervalDT))
+            if n_drop > len(IntervalDT)//2:
+                del IntervalDT[:n_drop], IntervalAUC[:n_drop]
+                self._window_pos[rule] = [p - n_drop for p in positions]
+
+    @property
+    def total(self) -> pd.Series:
+        '''total burden of every rule since the first update'''
+        return pd.Series(self._total, name='total', dtype='float64')
+
+    @property
+    def windowed(self) -> pd.DataFrame:
+        '''burden of every rule (row) within each window (column) before the latest row'''
+        return pd.DataFrame.from_dict({rule: list(sums) for rule, sums in self._window_sum.items()},
+                                      orient='index', columns=self.windows)
+
+    @property
+    def summary(self) -> pd.DataFrame:
+        '''total and windowed burden of every rule'''
+        return self.windowed.join(self.total).loc[:, ['total'] + self.windows]
@@ -1,4 +1,6 @@
 from pathlib import Path
+import re
+import numpy as np
 import pandas as pd
 
 # Define class variable
@@ -12,6 +14,12 @@ _FieldValue_xmldir = "EventsConfig/EventGroup/EventType/DataField"
 #_FieldValue_xmldir = "Events/Event/FieldValue"
 _Event_xmldir = "Events/Event"
 _Note_dir = "annotations/notes"
+## datetime str formats tried (in order) when parsing exported ICM+ files
+_DT_formats = ['%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M:%S.%f', '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M:%S', '%d-%m-%Y %H:%M:%S.%f', '%d.%m.%Y %H:%M:%S',
+               '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M:%S.%f',
+               '%d/%m/%Y %H.%M.%S', '%Y/%m/%d %H.%M.%S']   # icmevents in HDF5 may record time as xx.xx.xx
+## xx.xx.xx time of icmevents, rewritten to xx:xx:xx without touching the fractional seconds dot
+_DotTime_regex = re.compile(r'(?<![\d.])(\d{1,2})\.(\d{2})\.(\d{2})(?![\d:])')
 
 
 class subDF_str_attr:
@@ -65,26 +73,129 @@ def get_file_list(folder_dir, file_type = None, include_subfolders = False, expo
     return out_list
 
 ###====Human readable & serial datetime converter    
-def Ser2DT(serDT) -> pd.Timestamp:
-    '''change serial datetime in excel to human readable datetime accuracy to 9th decimal'''
+_SerialEpoch = pd.Timestamp('1899-12-30')    # Note, not 31st Dec but 30th!
+
+def Ser2DT(serDT):
+    '''
+    change serial datetime in excel to human readable datetime accuracy to 9th decimal.
+    Accept a scalar (return pd.Timestamp) or an array/pd.Series (converted in one vectorized call, return DatetimeIndex/pd.Series)
+    '''
     # from serial datetime (excel compatible) to human readable datetime
     try:
-        return pd.to_datetime('1899-12-30') + pd.to_timedelta(serDT,'D')
+        return _SerialEpoch + pd.to_timedelta(serDT,'D')
     except:
         raise Exception('Input type not float or np.float64')
         
-def DT2Ser(DT) -> float:
-    '''change human readable datetime to serial datetime in excel accuracy to 9th decimal'''
+def DT2Ser(DT):
+    '''
+    change human readable datetime to serial datetime in excel accuracy to 9th decimal.
+    Accept a scalar (return float) or an array/pd.Series of str or datetime (converted in one vectorized call, return np.ndarray/pd.Series)
+    '''
     # From human readable datetime string to serial datetime
+    if np.ndim(DT) == 0:
+        try:
+            date1= pd.to_datetime(_DotTime_regex.sub(r'\1:\2:\3', DT)) # for some reason, icmevents in HDF5 will record time as xx.xx.xx which should be corrected to xx:xx:xx
+        except:
+            date1= DT
+        delta = date1 - _SerialEpoch
+        ser = float(delta.days) + float(delta.seconds/(86400)+delta.microseconds/(86400*10**6))
+        return ser
+    index = DT.index if isinstance(DT, pd.Series) else None
+    DT = pd.Series(np.asarray(DT))
+    if DT.dtype == object:
+        IsStr = DT.map(type).eq(str).to_numpy()
+        DT[IsStr] = DT[IsStr].str.replace(_DotTime_regex, r'\1:\2:\3', regex=True)
+    # whole microseconds since the serial epoch, split into days and fraction of day
+    delta = (pd.to_datetime(DT) - _SerialEpoch).to_numpy().astype('timedelta64[us]')
+    usec = delta.astype('int64')
+    days = usec // (86400*10**6)
+    ser = days + (usec - days*(86400*10**6))/(86400*10**6)
+    ser[np.isnat(delta)] = np.nan
+    return ser if index is None else pd.Series(ser, index=index)
+
+def detect_DT_format(strDT, n_sample = 20, formats = None):
+    '''return the format in formats (default _DT_formats) parsing most of the first n_sample non-empty str (first one on ties), None if none fits'''
+    sample = pd.Series(strDT).dropna().iloc[:n_sample]
+    best_format, best_count = None, 0
+    for DT_format in (_DT_formats if formats is None else formats):
+        count = pd.to_datetime(sample, format=DT_format, errors='coerce').notna().sum()
+        if count == len(sample):
+            return DT_format
+        if count > best_count:
+            best_format, best_count = DT_format, count
+    return best_format
+
+def _dayfirst2DT(strDT, DT_format):
+    '''
+    fast path of str2DT for zero padded "%d/%m/%Y %H:%M:%S[.%f]" str (any date/time separator): reorder the bytes of the fixed width str into ISO 8601 and let numpy parse them.
+    return None if DT_format is not of this kind or any str does not fit it.
+    '''
+    matched = re.fullmatch(r'%d(.)%m\1%Y %H(.)%M\2%S(\.%f)?', DT_format)
+    if matched is None:
+        return None
     try:
-        date1= pd.to_datetime(DT.replace('.',':')) # for some reason, icmevents in HDF5 will record time as xx.xx.xx which should be corrected to xx:xx:xx
-    except:
-        date1= DT
-        
-    temp = pd.to_datetime('1899-12-30')    # Note, not 31st Dec but 30th!
-    delta = date1 - temp
-    ser = float(delta.days) + float(delta.seconds/(86400)+delta.microseconds/(86400*10**6))
-    return ser     
+        strBytes = np.asarray(strDT, dtype='S')
+    except (UnicodeEncodeError, ValueError):
+        return None
+    width = strBytes.dtype.itemsize
+    if width != 19 and not (matched.group(3) and width > 20):
+        return None
+    chars = strBytes.view('u1').reshape(-1, width)
+    DateSep, TimeSep = ord(matched.group(1)), ord(matched.group(2))
+    SepPos, SepChar = [2, 5, 10, 13, 16], [DateSep, DateSep, ord(' '), TimeSep, TimeSep]
+    if width > 19:
+        SepPos.append(19)
+        SepChar.append(ord('.'))
+    DigitPos = np.setdiff1d(np.arange(width), SepPos)
+    if not ((chars[:, SepPos] == SepChar).all() and ((chars[:, DigitPos] >= ord('0')) & (chars[:, DigitPos] <= ord('9'))).all()):
+        return None
+    ISOchars = np.empty_like(chars)
+    ISOchars[:, 0:4], ISOchars[:, 5:7], ISOchars[:, 8:10], ISOchars[:, 11:] = chars[:, 6:10], chars[:, 3:5], chars[:, 0:2], chars[:, 11:]
+    ISOchars[:, [4, 7, 10, 13, 16]] = [ord('-'), ord('-'), ord('T'), ord(':'), ord(':')]
+    try:
+        return ISOchars.view(f'S{width}').ravel().astype('datetime64[ns]')
+    except ValueError:
+        return None
+
+def _DT2dayfirst(DTvalues, to_ms = True):
+    '''
+    inverse of _dayfirst2DT: format datetime64 values to "%d/%m/%Y %H:%M:%S.%f"[:-3] str (millisecond, or "%d/%m/%Y %H:%M:%S" if not to_ms) in one vectorized pass.
+    return np.ndarray of object, NaT gives None.
+    '''
+    DTvalues = np.asarray(DTvalues, dtype='datetime64[ns]')
+    IsNaT = np.isnat(DTvalues)
+    ISOstr = np.datetime_as_string(np.where(IsNaT, np.datetime64(0, 'ns'), DTvalues).astype('datetime64[ms]' if to_ms else 'datetime64[s]'))
+    width = ISOstr.dtype.itemsize // 4
+    ISOchars = ISOstr.astype(f'S{width}').view('u1').reshape(-1, width)
+    chars = np.empty_like(ISOchars)
+    chars[:, 0:2], chars[:, 3:5], chars[:, 6:10], chars[:, 11:] = ISOchars[:, 8:10], ISOchars[:, 5:7], ISOchars[:, 0:4], ISOchars[:, 11:]
+    chars[:, [2, 5, 10]] = [ord('/'), ord('/'), ord(' ')]
+    DTstr = chars.view(f'S{width}').ravel().astype(f'U{width}').astype(object)
+    DTstr[IsNaT.ravel()] = None
+    return DTstr.reshape(DTvalues.shape)
+
+def str2DT(strDT, dayfirst = True, DT_format = None) -> pd.Series:
+    '''
+    parse a column of datetime str in one vectorized call with an explicit format (detected from the first rows if DT_format is None).
+    Only rows failing the format are parsed one by one with pd.to_datetime(dayfirst=dayfirst).
+    '''
+    strDT = pd.Series(strDT)
+    if DT_format is None:
+        DT_format = detect_DT_format(strDT)
+    if DT_format is None:
+        DT = pd.Series(pd.NaT, index=strDT.index, dtype='datetime64[ns]')
+    else:
+        valid = strDT.notna().to_numpy()
+        DTvalues = _dayfirst2DT(strDT.to_numpy()[valid], DT_format)
+        if DTvalues is None:
+            DT = pd.to_datetime(strDT, format=DT_format, errors='coerce')
+        else:
+            DT = pd.Series(pd.NaT, index=strDT.index, dtype='datetime64[ns]', name=strDT.name)
+            DT[valid] = DTvalues
+    failed = DT.isna() & strDT.notna()
+    if failed.any():
+        DT[failed] = [pd.to_datetime(s, dayfirst=dayfirst) for s in strDT[failed]]
+    return DT
 
 def filter_by_id(pd, id_list):
         '''filter the dataframe by id_list'''
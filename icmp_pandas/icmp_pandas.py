@@ -2,12 +2,26 @@ from .ARTF import Artf_DataFrame
 from .Event import Event_DataFrame 
 from .Trend import Trend_DataFrame 
 from .ICMP_h5 import ICMP_h5py 
+from .Catalog import H5Catalog
 from ._utility import *
+import os
+import pandas as pd
+from pathlib import Path
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 def read_h5(*args, **kwargs):
     '''read file (hdf5) as a h5py subclass called ICMP_h5'''
     return ICMP_h5py(*args, **kwargs)
 
+def read_catalog(catalog_dir, folder_dir=None, *args, **kwargs):
+    '''open (or create) an H5Catalog of ICM+ HDF5 files, update it with files in folder_dir if given'''
+    catalog = H5Catalog(catalog_dir)
+    if folder_dir is not None:
+        catalog.update(folder_dir, *args, **kwargs)
+    return catalog
+
 def read_Event(file_dir=None,*args, **kwargs):
     '''read file (hdf5, xml, csv) as a pd.DataFrame subclass called Event_DataFrame'''
     return Event_DataFrame(file_dir, *args, **kwargs)
@@ -22,3 +36,88 @@ def read_Artf(artf_source=None, *args, **kwargs):
     '''read file (artf, xml) as a pd.DataFrame subclass called Artf_DataFrame'''
     return Artf_DataFrame(artf_source, *args, **kwargs)
 
+
+def mask(data, artf, signal_label=None, inplace=False):
+    '''
+    blank (NaN) samples of signal (pd.Series), trend (Trend_DataFrame) or (DTidx, values) chunk within artefacts of artf (Artf_DataFrame or artf/csv file).
+    see Artf_DataFrame.mask_signal, and Artf_DataFrame.mask_chunks for streamed chunks.
+    '''
+    if not isinstance(artf, Artf_DataFrame):
+        artf = Artf_DataFrame(artf)
+    return artf.mask_signal(data, signal_label=signal_label, inplace=inplace)
+
+
+def _read_file(reader, file_dir, kwargs):
+    '''worker of iter_read_many, read one file and return it as pd.DataFrame'''
+    return pd.DataFrame(reader(file_dir, **kwargs))
+
+def _collect(file_dir, future):
+    try:
+        return file_dir, future.result()
+    except Exception as e:
+        return file_dir, e
+
+def iter_read_many(reader, file_list, workers=None, max_inflight=None, **kwargs):
+    '''
+    Read many files with reader (e.g. Trend_DataFrame, Event_DataFrame) over a process pool of "workers" processes.
+    Yield (file_dir, pd.DataFrame) in the order of file_list, or (file_dir, Exception) if the file failed to load.
+    At most max_inflight (default 2*workers) files are read ahead of the consumer, so memory stays bounded.
+    '''
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for file_dir in file_list:
+            try:
+                yield file_dir, _read_file(reader, file_dir, kwargs)
+            except Exception as e:
+                yield file_dir, e
+        return
+    if max_inflight is None:
+        max_inflight = 2*workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for file_dir in file_list:
+            pending.append((file_dir, executor.submit(_read_file, reader, file_dir, kwargs)))
+            if len(pending) >= max_inflight:
+                yield _collect(*pending.popleft())
+        while pending:
+            yield _collect(*pending.popleft())
+
+def _read_many(reader, file_list, workers, max_inflight, key_func, **kwargs):
+    '''
+    concatenate output of iter_read_many into one DataFrame keyed by file, errors are stored in attrs["errors"].
+    Files sharing a file name are keyed by their full path instead, a key_func giving the same key to several files raises Exception.
+    '''
+    DF_list = []
+    errors = {}
+    for file_dir, DF in iter_read_many(reader, file_list, workers=workers, max_inflight=max_inflight, **kwargs):
+        if isinstance(DF, Exception):
+            errors[str(file_dir)] = repr(DF)
+        else:
+            DF_list.append((file_dir, DF))
+    keys = [Path(file_dir).stem if key_func is None else key_func(file_dir) for file_dir, _ in DF_list]
+    duplicated = pd.Index(keys).duplicated(keep=False)
+    if duplicated.any():
+        if key_func is not None:
+            raise Exception(f'key_func gives the same key to several files: {sorted(set(pd.Index(keys)[duplicated]))}')
+        warnings.warn(f'{duplicated.sum()} files share a file name and are keyed by full path instead')
+        keys = [str(file_dir) if dup else key for (file_dir, _), key, dup in zip(DF_list, keys, duplicated)]
+    if errors:
+        warnings.warn(f'{len(errors)} of {len(errors)+len(DF_list)} files failed to load, see attrs["errors"]')
+    out_df = reader(pd.concat([DF for _, DF in DF_list], keys=keys, names=['file']) if DF_list else None)
+    out_df.attrs['errors'] = errors
+    return out_df
+
+def read_Trend_many(file_list, workers=None, max_inflight=None, key_func=None, **kwargs):
+    '''
+    read many trend files (see read_Trend) in parallel as one Trend_DataFrame with the file (file name by default, or key_func(file_dir)) as first index level.
+    Files failing to load are skipped and listed in attrs["errors"] as {file_dir: error}.
+    '''
+    return _read_many(Trend_DataFrame, file_list, workers, max_inflight, key_func, **kwargs)
+
+def read_Event_many(file_list, workers=None, max_inflight=None, key_func=None, **kwargs):
+    '''
+    read many event files (see read_Event) in parallel as one Event_DataFrame with the file (file name by default, or key_func(file_dir)) as first index level.
+    Files failing to load are skipped and listed in attrs["errors"] as {file_dir: error}.
+    '''
+    return _read_many(Event_DataFrame, file_list, workers, max_inflight, key_func, **kwargs)
@@ -0,0 +1,344 @@
+import warnings
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+
+from icmp_pandas.ARTF import Artf_DataFrame
+from icmp_pandas.Episode import Episode_Dataframe
+from icmp_pandas.ICMP_h5 import ICMP_h5py, unix_us2DTidx
+from icmp_pandas.Trend import Trend_Series, Trend_DataFrame, Burden_Accumulator, getTrendEpisodeDF
+from icmp_pandas._utility import DT2Ser
+
+T0 = pd.Timestamp('2024-01-01')
+H = 200
+
+
+def rand_artf(rng, n, labels):
+    '''random artefacts on whole seconds within [T0, T0+H s], zero-length ones included'''
+    starts = rng.integers(0, H, n)
+    durations = rng.choice([0, 0, 1, 2, 5, 10, 20], n)
+    return Artf_DataFrame(pd.DataFrame({'signal_label': rng.choice(labels, n), 'ModifiedBy': 'test', 'ModifiedDate': T0,
+                                        'StartTime': T0 + pd.to_timedelta(starts, 's'),
+                                        'EndTime': T0 + pd.to_timedelta(starts + durations, 's')}))
+
+
+def grid(artf, label):
+    '''membership of every half second of [0, H+30] in the closed artefacts of label (Global included)'''
+    points = np.arange(0, 2*(H + 30) + 1)/2
+    inside = np.zeros(len(points), dtype=bool)
+    for row in pd.DataFrame(artf).itertuples():
+        if row.signal_label in (label, 'Global'):
+            start, end = (row.StartTime - T0).total_seconds(), (row.EndTime - T0).total_seconds()
+            inside |= (points >= start) & (points <= end)
+    return inside
+
+
+def expected_grid(inA, inB, rule):
+    '''rule on every half second, whole seconds are also inside when a neighbouring half second is (result intervals are closed)'''
+    out = rule(inA, inB)
+    out[2:-1:2] |= out[1:-2:2] | out[3::2]
+    return out
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_set_algebra_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    A = rand_artf(rng, 30, ['Global', 'ICP', 'ABP'])
+    B = rand_artf(rng, 30, ['Global', 'ICP', 'HR'])
+    cases = [('union', A.union(B), np.logical_or),
+             ('intersection', A.intersection(B), np.logical_and),
+             ('difference', A.difference(B), lambda inA, inB: inA & ~inB),
+             ('merge_overlaps', A.merge_overlaps(), lambda inA, inB: inA)]
+    for name, result, rule in cases:
+        for label in ['ICP', 'ABP', 'HR']:
+            assert (grid(result, label) == expected_grid(grid(A, label), grid(B, label), rule)).all(), (name, label)
+        # merged intervals of a label are disjoint and do not touch
+        for label, group in pd.DataFrame(result).groupby('signal_label'):
+            group = group.sort_values('StartTime')
+            assert (group['StartTime'].to_numpy()[1:] > group['EndTime'].to_numpy()[:-1]).all(), (name, label)
+
+
+def test_point_artefacts_kept():
+    flagged = [T0 + pd.Timedelta('10s'), T0 + pd.Timedelta('60s')]
+    artf = Artf_DataFrame.from_dt_list(flagged, 'ICP', window_before='0s', window_after='0s').merge_overlaps()
+    assert list(artf['StartTime']) == flagged and list(artf['EndTime']) == flagged
+    DTidx = pd.date_range(T0, periods=120, freq='1s')
+    assert list(DTidx[artf.artf_mask(DTidx, 'ICP')]) == flagged
+    assert not artf.artf_mask(DTidx, 'ABP').any()
+
+
+def test_episodes():
+    DTidx = pd.date_range(T0, periods=60, freq='1min')
+    ICP = Trend_Series(np.where((np.arange(60) >= 10) & (np.arange(60) < 30), 25., 10.), index=DTidx)
+    episodes = getTrendEpisodeDF(ICP > 20, MAX_TIME_GAP='5min', MIN_EPISODE_DURATION='5min')
+    assert len(episodes) == 1
+    assert episodes['StartDatetime'].iloc[0] == DTidx[10] and episodes['EndDatetime'].iloc[0] == DTidx[29]
+    assert episodes['DurationTimedelta'].iloc[0] == pd.Timedelta('19min')
+    assert getTrendEpisodeDF(ICP > 30).empty
+    # the final run is kept, runs split by a gap longer than MAX_TIME_GAP
+    episodes = getTrendEpisodeDF((ICP > 20).drop(DTidx[15:22]), MAX_TIME_GAP='5min', MIN_EPISODE_DURATION=None)
+    assert episodes['StartDatetime'].tolist() == [DTidx[10], DTidx[22]] and episodes['EndDatetime'].tolist() == [DTidx[14], DTidx[29]]
+    assert getTrendEpisodeDF(ICP < 20, MIN_EPISODE_DURATION='1min')['EndDatetime'].iloc[-1] == DTidx[-1]
+
+
+def test_episode_sweep():
+    DTidx = pd.date_range(T0, periods=60, freq='1min')
+    ICP = np.where((np.arange(60) >= 10) & (np.arange(60) < 30), 25., 10.)
+    trend = Trend_DataFrame(pd.DataFrame({'ICP': ICP}, index=DTidx))
+    sweep = trend.episode_sweep([('ICP', '>', 20), ('ICP', '<', 20), {'column': 'ICP', 'comparator': '>', 'threshold': 20, 'MIN_EPISODE_DURATION': '30min'}])
+    assert sweep['rule'].tolist() == ['ICP>20', 'ICP<20', 'ICP<20']
+    # each rule gives the same episodes as getTrendEpisodeDF
+    for (comparator, threshold), group in sweep.groupby(['comparator', 'threshold']):
+        IsInEpisode = trend['ICP'] > threshold if comparator == '>' else trend['ICP'] < threshold
+        expected = getTrendEpisodeDF(IsInEpisode)
+        assert group['StartDatetime'].tolist() == expected['StartDatetime'].tolist()
+        assert group['EndDatetime'].tolist() == expected['EndDatetime'].tolist()
+    with pytest.raises(Exception):
+        trend.episode_sweep([('ICP', '=>', 20)])
+
+
+def test_trapzoidal_auc():
+    DTidx = pd.date_range(T0, periods=121, freq='1min')
+    ICP = Trend_Series(np.full(121, 25.), index=DTidx)
+    auc = ICP.trapzoidal_auc(20)
+    assert np.isnan(auc.iloc[-1])
+    assert np.nansum(auc.to_numpy()) == pytest.approx(5*2)
+    assert np.nansum(ICP.trapzoidal_auc(30, IsUnderCurve=True).to_numpy()) == pytest.approx(5*2)
+    assert np.nansum(ICP.trapzoidal_auc(30).to_numpy()) == 0
+    # intervals across a gap are not counted
+    assert np.nansum(ICP.drop(DTidx[50:60]).trapzoidal_auc(20).to_numpy()) == pytest.approx(5*(120 - 11)/60)
+    summary = ICP.burden_summary(20, freq='1h')
+    assert summary['total'] == pytest.approx(10) and summary['1h'].tolist() == pytest.approx([5, 5, 0])
+
+
+def test_burden_accumulator():
+    DTidx = pd.date_range(T0, periods=121, freq='1min')
+    ICP = Trend_Series(np.full(121, 25.), index=DTidx)
+    accumulator = Burden_Accumulator({'ICP': [20, (30, True)]}, windows=['1h'])
+    for i in range(0, 121, 40):
+        accumulator.update(pd.DataFrame({'ICP': ICP.to_numpy()[i:i+40]}, index=DTidx[i:i+40]))
+    assert accumulator.total['ICP>20'] == pytest.approx(np.nansum(ICP.trapzoidal_auc(20).to_numpy()))
+    assert accumulator.total['ICP<30'] == pytest.approx(10)
+    # intervals starting after the window start, i.e. the last 59 one-minute intervals
+    assert accumulator.windowed.loc['ICP>20', '1h'] == pytest.approx(5*59/60)
+    with pytest.warns(UserWarning):
+        accumulator.update_row(DTidx[0], {'ICP': 100})
+    assert accumulator.total['ICP>20'] == pytest.approx(10)
+
+
+def test_from_dt_list():
+    flagged = pd.Series(T0 + pd.to_timedelta([0, 1, 2, 60, 0], 's'))
+    artf = Artf_DataFrame.from_dt_list(flagged, 'ICP', dt_interval='10s', window_before='1s', window_after='2s')
+    assert artf['signal_label'].tolist() == ['ICP', 'ICP']
+    assert artf['StartTime'].tolist() == [T0 - pd.Timedelta('1s'), T0 + pd.Timedelta('59s')]
+    assert artf['EndTime'].tolist() == [T0 + pd.Timedelta('4s'), T0 + pd.Timedelta('62s')]
+    # a filtered Series keeps its integer index and is still a plain list of times
+    assert Artf_DataFrame.from_dt_list(flagged[flagged.index > 2], 'ICP')['signal_label'].tolist() == ['ICP', 'ICP']
+    keyed = pd.Series(flagged.to_numpy()[:4], index=['ICP', 'ABP', 'ICP', 'ABP'])
+    artf = Artf_DataFrame.from_dt_list(keyed, dt_interval='1s', window_before='0s', window_after='0s')
+    assert sorted(zip(artf['signal_label'], artf['StartTime'])) == sorted(zip(keyed.index, keyed))
+    flags = pd.DataFrame({'ICP': [True, True, False], 'ABP': [False, False, True]}, index=flagged.to_numpy()[:3])
+    artf = Artf_DataFrame.from_dt_list(flags, window_before='0s', window_after='0s')
+    assert sorted(zip(artf['signal_label'], artf['StartTime'], artf['EndTime'])) == [('ABP', T0 + pd.Timedelta('2s'), T0 + pd.Timedelta('2s')), ('ICP', T0, T0 + pd.Timedelta('1s'))]
+    assert Artf_DataFrame.from_dt_list(['01/02/2024 10:00:00'], 'ICP', window_before='0s', window_after='0s')['StartTime'].tolist() == [pd.Timestamp('2024-02-01 10:00:00')]
+
+
+def test_mask_signal():
+    artf = Artf_DataFrame(pd.DataFrame({'signal_label': ['Global', 'ICP'], 'ModifiedBy': 'test', 'ModifiedDate': T0,
+                                        'StartTime': [T0 + pd.Timedelta('2s'), T0 + pd.Timedelta('5s')],
+                                        'EndTime': [T0 + pd.Timedelta('3s'), T0 + pd.Timedelta('6s')]}))
+    DTidx = pd.date_range(T0, periods=10, freq='1s')
+    trend = pd.DataFrame({'ICP': np.arange(10.), 'ABP': np.arange(10.)}, index=DTidx)
+    masked = artf.mask_signal(trend)
+    assert masked['ICP'].isna().to_numpy().nonzero()[0].tolist() == [2, 3, 5, 6]
+    assert masked['ABP'].isna().to_numpy().nonzero()[0].tolist() == [2, 3]
+    assert trend.notna().all().all()
+    assert artf.mask_signal(trend['ICP']).equals(masked['ICP'])
+    chunks = [(DTidx.values[i:i+4], trend['ICP'].to_numpy()[i:i+4].copy()) for i in range(0, 10, 4)]
+    values = np.concatenate([values for _, values in artf.mask_chunks(chunks, 'ICP', inplace=True)])
+    assert np.array_equal(values, masked['ICP'].to_numpy(), equal_nan=True)
+    # chunks that cannot hold NaN in place are masked on a float copy
+    ReadOnly = np.arange(10.)
+    ReadOnly.flags.writeable = False
+    for chunk_values in (ReadOnly, np.arange(10)):
+        _, values = artf.mask_signal((DTidx.values, chunk_values), 'ICP', inplace=True)
+        assert np.array_equal(values, masked['ICP'].to_numpy(), equal_nan=True)
+
+
+def test_deviation_events():
+    minutes = lambda *m: [T0 + pd.Timedelta(minutes=x) for x in m]
+    episodes = Episode_Dataframe({'StartDatetime': minutes(0, 100, 200, 300), 'DurationTimedelta': [pd.Timedelta('60min')]*4,
+                                  'EndDatetime': minutes(60, 160, 260, 360)})
+    # interventions exactly on the end of episode 0 and on the start of episode 3 are within the episode
+    interventions = pd.Series(['a', 'b', 'c', 'd', 'e'], index=minutes(60, 30, 100, 110, 300))
+    episodes = episodes.addEvents(interventions, 'IntervsDict')
+    assert episodes['IntervsDict'].iloc[0] == dict(zip(minutes(30, 60), ['b', 'a']))
+    deviations = episodes.getAllDeviationDF('20min')
+    assert deviations['Type of deviation event'].tolist() == ['From start of episode to first intervention logged', 'Between interventions',
+                                                              'From last intervention logged to end of episode', 'Empty Episode',
+                                                              'From last intervention logged to end of episode']
+    assert deviations['Episode'].tolist() == [0, 0, 1, 2, 3]
+    assert deviations['StartDatetime'].tolist() == minutes(0, 30, 110, 200, 300)
+    assert deviations['EndDatetime'].tolist() == minutes(30, 60, 160, 260, 360)
+    assert (deviations['DurationTimedelta'] == deviations['EndDatetime'] - deviations['StartDatetime']).all()
+    assert episodes.getEmptyInterv().index.tolist() == [2]
+    counts = episodes.addEvents(interventions, 'IntervsDict', CountOnly=True)
+    assert counts['IntervsDict'].tolist()[:2] == [2, 2] and counts.getEmptyInterv().index.tolist() == [2]
+    for kwargs in ({'ValueOnly': True}, {'CountOnly': True}):
+        with pytest.raises(Exception):
+            episodes.addEvents(interventions, 'IntervsDict', **kwargs).getAllDeviationDF('20min')
+
+
+## ICP: 10 Hz, 5 s block, a frequency 0 block then 3 s block after a 5 s gap (contiguous). ABP: 5 Hz, one 20 s block (gzip)
+T0_us = T0.value // 1000
+H5Index_dtype = np.dtype([('startidx', '<u8'), ('starttime', '<u8'), ('length', '<u8'), ('frequency', '<f8')])
+
+
+@pytest.fixture
+def h5_dir(tmp_path):
+    h5_dir = str(tmp_path/'pt.hdf5')
+    with h5py.File(h5_dir, 'w') as H5File:
+        H5File.attrs.create('dataStartTime', np.array(['2024/01/01 00.00.00'], dtype=object), dtype=h5py.string_dtype())
+        H5File.attrs['ScalarAttribute'] = np.int64(3)
+        H5File.create_dataset('waves/ICP', data=np.arange(80, dtype='float32'))
+        H5File.create_dataset('waves/ICP.index', data=np.array([(0, T0_us, 50, 10.), (50, T0_us + 6*10**6, 0, 0.), (50, T0_us + 10*10**6, 30, 10.)], dtype=H5Index_dtype))
+        H5File.create_dataset('waves/ABP', data=np.arange(100, dtype='float64'), chunks=(16,), compression='gzip')
+        H5File.create_dataset('waves/ABP.index', data=np.array([(0, T0_us, 100, 5.)], dtype=H5Index_dtype))
+    return h5_dir
+
+
+def test_catalog_fault_tolerant(h5_dir):
+    with h5py.File(h5_dir, 'a') as H5File:
+        H5File.create_dataset('waves/BAD', data=np.arange(3.))
+        H5File.create_dataset('waves/BAD.index', data=np.arange(3))
+    with ICMP_h5py(h5_dir, mode='r') as H5File:
+        with pytest.warns(UserWarning):
+            assert sorted(H5File.waves_label) == ['ABP', 'BAD', 'ICP']
+        assert H5File.FileAttribute['ScalarAttribute'] == 3
+        assert H5File.RecordingStartTime == T0
+        assert sorted(H5File.SignalInfo.index) == ['waves/ABP', 'waves/ICP']
+        assert H5File.SignalInfo.loc['waves/ICP', ['samples', 'blocks', 'gaps']].tolist() == [80, 2, 1]
+        assert H5File.SignalInfo.loc['waves/ICP', 'EndTime'] == T0 + pd.Timedelta('12.9s')
+
+
+def test_time_windowed_read(h5_dir):
+    Times = lambda *seconds: [T0 + pd.Timedelta(seconds=s) for s in seconds]
+    with ICMP_h5py(h5_dir, mode='r') as H5File:
+        # start is rounded up and end down to the next sample, both inclusive, the frequency 0 block is dropped
+        H5Index = H5File.sliceH5Index(H5File.get('waves/ICP.index')[()], *Times(0.05, 10.25))
+        assert H5Index[['startidx', 'length']].tolist() == [(1, 49), (50, 3)]
+        assert H5Index['starttime'].tolist() == [T0_us + 10**5, T0_us + 10*10**6]
+        ICP = H5File.get_waves('ICP', *Times(0.05, 10.2))
+        assert ICP.tolist() == list(range(1, 53)) and ICP.index[-1] == Times(10.2)[0]
+        assert H5File.get_waves('ICP', *Times(6, 9.95)).empty
+        # same as filtering the full read, for the contiguous and the gzip dataset
+        for label in ['ICP', 'ABP']:
+            full = H5File.get_waves(label)
+            for start, end in [(None, 3), (2.33, None), (4.9, 10), (0, 30), (-5, -1)]:
+                start, end = [None if s is None else Times(s)[0] for s in (start, end)]
+                assert H5File.get_waves(label, start, end).equals(full.loc[start:end])
+
+
+def test_lazy_signal(h5_dir):
+    with ICMP_h5py(h5_dir, mode='r') as H5File:
+        ICP, ABP = H5File.get_lazy_waves('ICP'), H5File.get_lazy_waves('ABP')
+        assert ICP.is_memmap and not ABP.is_memmap
+        assert len(ICP) == 80 and ICP.StartTime == T0 and ICP.EndTime == T0 + pd.Timedelta('12.9s')
+        assert ICP.time_at(49) == T0 + pd.Timedelta('4.9s') and ICP.time_at(50) == T0 + pd.Timedelta('10s')
+        assert ICP.time_at([0, 79]).tolist() == [T0, T0 + pd.Timedelta('12.9s')]
+        for position in (-1, 80):
+            with pytest.raises(IndexError):
+                ICP.time_at(position)
+        # timestamps within the gap map to the first sample after it, out of range to either end
+        assert ICP.position_at(T0 + pd.Timedelta('7s')) == ICP.position_at(T0 + pd.Timedelta('7s'), side='right') == 50
+        assert ICP.position_at(T0 + pd.Timedelta('0.1s')) == 1 and ICP.position_at(T0 + pd.Timedelta('0.1s'), side='right') == 2
+        assert ICP.position_at(T0 + pd.Timedelta('0.15s')) == 2
+        assert ICP.position_at(T0 - pd.Timedelta('1s')) == 0 and ICP.position_at(T0 + pd.Timedelta('1h')) == 80
+        for signal, label in ((ICP, 'ICP'), (ABP, 'ABP')):
+            full = H5File.get_waves(label)
+            assert signal[10:60].equals(full.iloc[10:60]) and signal[-5:].equals(full.iloc[-5:])
+            assert signal[T0 + pd.Timedelta('4s'):T0 + pd.Timedelta('11s')].equals(full.loc[T0 + pd.Timedelta('4s'):T0 + pd.Timedelta('11s')])
+            UnixTime, values = signal.read_array(45, 55)
+            assert np.array_equal(unix_us2DTidx(UnixTime), full.index[45:55]) and np.array_equal(values, full.to_numpy()[45:55])
+        # reads are writable and do not change the file
+        part = ICP[0:10]
+        part.iloc[0] = -1
+        assert ICP[0:1].iloc[0] == 0
+        with pytest.raises(TypeError):
+            ICP[0:10:2]
+        # copy=False gives the read-only memmap slice
+        _, values = ICP.read_array(0, 10, copy=False)
+        assert not values.flags.writeable and np.array_equal(values, np.arange(10))
+
+
+def test_iter_chunks(h5_dir):
+    with ICMP_h5py(h5_dir, mode='r') as H5File:
+        full = H5File.get_waves('ICP')
+        ICP = H5File.get_lazy_waves('ICP')
+        assert ICP.segments().tolist() == [[0, 50], [50, 80]]
+        chunks = list(H5File.iter_waves('ICP', chunk='2s', overlap='0.5s'))
+        # chunks of 20 samples with the preceding 5 samples of the same segment, never across the gap
+        bounds = [(0, 20), (15, 40), (35, 50), (50, 70), (65, 80)]
+        assert len(chunks) == len(bounds)
+        for (DTidx, values), (start, stop) in zip(chunks, bounds):
+            assert DTidx.equals(full.index[start:stop]) and np.array_equal(values, full.to_numpy()[start:stop])
+            assert values.flags.writeable
+        assert not any(values.flags.writeable for _, values in ICP.iter_chunks('2s', '0.5s', copy=False))
+        ABP = [values for _, values in H5File.iter_waves('ABP', chunk='7s', overlap='0s')]
+        assert [len(values) for values in ABP] == [35, 35, 30] and np.array_equal(np.concatenate(ABP), np.arange(100))
+        with pytest.raises(Exception):
+            next(ICP.iter_chunks(chunk='1s', overlap='1s'))
+
+
+@pytest.mark.parametrize('grid_window', [2**20, 7])
+def test_get_aligned(h5_dir, monkeypatch, grid_window):
+    # a small window checks that reads in several windows give the same grid
+    monkeypatch.setattr('icmp_pandas.ICMP_h5._grid_window', grid_window)
+    # sample value is its position, positions 0-49 from T0 and 50-79 from T0+10s at 10 Hz
+    SampleAt = np.r_[np.arange(5)*10., np.full(5, np.nan), 50 + np.arange(3)*10., np.full(7, np.nan)]
+    with ICMP_h5py(h5_dir, mode='r') as H5File:
+        aligned = H5File.get_aligned(['ICP', 'waves/ABP'], freq='1s')
+        assert aligned.index.equals(pd.date_range(T0, periods=20, freq='1s'))
+        assert np.array_equal(aligned['ICP'].to_numpy(), SampleAt, equal_nan=True)
+        assert np.array_equal(aligned['waves/ABP'].to_numpy(), np.arange(20)*5.)
+        # mean of the samples within each grid interval, grid points within the gap stay NaN
+        mean = H5File.get_aligned('ICP', freq=1, method='mean')['ICP'].to_numpy()
+        assert np.array_equal(mean, SampleAt[:13] + 4.5, equal_nan=True)
+        # grid between samples is interpolated, start/end restrict the grid
+        fine = H5File.get_aligned('ICP', freq='50ms', start=T0 + pd.Timedelta('4.8s'), end=T0 + pd.Timedelta('10.1s'))['ICP']
+        assert fine.iloc[:3].tolist() == pytest.approx([48, 48.5, 49]) and fine.iloc[-3:].tolist() == pytest.approx([50, 50.5, 51])
+        assert fine.iloc[3:-3].isna().all()
+        with pytest.raises(Exception):
+            H5File.get_aligned('ICP', method='nearest')
+
+
+def test_strdf_stays_str():
+    artf = Artf_DataFrame(pd.DataFrame({'signal_label': ['Global'], 'ModifiedBy': 'test', 'ModifiedDate': [T0],
+                                        'StartTime': [T0 + pd.Timedelta('1.5s')], 'EndTime': [T0 + pd.Timedelta('2s')]}))
+    strdf = artf.strdf
+    assert strdf.iloc[0][['ModifiedDate', 'StartTime', 'EndTime']].tolist() == ['01/01/2024 00:00:00', '01/01/2024 00:00:01.500', '01/01/2024 00:00:02.000']
+    assert (strdf.iloc[:1].dtypes == object).all() and (strdf.copy().dtypes == object).all()
+    assert pd.api.types.is_datetime64_any_dtype(artf['StartTime']) and Artf_DataFrame(strdf).equals(artf)
+
+
+@pytest.mark.parametrize('write_block', [2**16, 3])
+def test_write_artf_same_as_tree(tmp_path, monkeypatch, write_block):
+    import xml.etree.ElementTree as ET
+    import icmp_pandas.ARTF
+    monkeypatch.setattr(icmp_pandas.ARTF, '_artf_write_block', write_block)
+    Start = T0 + pd.to_timedelta(np.arange(10) * 1.25, unit='s')
+    artf = Artf_DataFrame(pd.DataFrame({'signal_label': ['ICP', 'ABP', 'Global', 'ICP', 'a&"b<c>', 'Global', 'ICP', 'ABP', 'ICP', 'ICP'],
+                                        'ModifiedBy': ['me & "you"', 'auto', 'auto', 'x<y>', 'auto', 'tab\tline\n', 'auto', 'é', 'auto', 'auto'],
+                                        'ModifiedDate': T0 + pd.Timedelta('0.7s'), 'StartTime': Start, 'EndTime': Start + pd.Timedelta('0.5s')}))
+    for df in (artf, artf.iloc[:0]):
+        df.write_artf(tmp_path / 'stream.artf')
+        ET.ElementTree(df.artf_xml).write(tmp_path / 'tree.artf')
+        assert (tmp_path / 'stream.artf').read_bytes() == (tmp_path / 'tree.artf').read_bytes()
+
+
+def test_DT2Ser_dot_time():
+    Expected = DT2Ser(pd.Series([pd.Timestamp('2024-03-01 10:20:00.5')]))[0]
+    for DT in ['2024-03-01 10:20:00.500', '2024/03/01 10.20.00.500']:
+        assert DT2Ser(pd.Series([DT]))[0] == pytest.approx(Expected, abs=1e-9) and DT2Ser(DT) == pytest.approx(Expected, abs=1e-9)
+    assert DT2Ser(pd.Series(['2024/03/01 10.20.00']))[0] == pytest.approx(Expected - 0.5/86400, abs=1e-9)